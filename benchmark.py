@@ -0,0 +1,297 @@
+# (c) 2018, Roman Miroshnychenko <roman1972@gmail.com>
+# License: GPL v.3
+"""
+Benchmark for Kodistubs generator stages on synthetic Doxygen and SWIG fixtures
+
+Does not require Kodi sources or Doxygen.
+"""
+
+import argparse
+import copy
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import lxml.etree as etree
+
+from generator import (BuildDirs, build_parser, generate_stubs, get_code_hash, get_doxy_state,
+                       render_module)
+from kodistubs_generator.cache import parse_cache, translation_cache
+from kodistubs_generator.docsparser import (MODULES, flatten_module_docs, parse_description,
+                                            parse_module_docs)
+from kodistubs_generator.doxygen import save_doxy_state
+from kodistubs_generator.intermediate import dumps_module_docs
+from kodistubs_generator.swigparser import load_swig_index, parse_swig_xml
+from kodistubs_generator.swigtypes import (translate_decl_type, translate_ret_type,
+                                           translate_value)
+from tests.fixtures import FixtureBuilder
+
+REPORT_VERSION = 1
+
+# Modules that a generator run with nothing to regenerate should not import
+HEAVY_MODULES = (
+    'jinja2',
+    'kodistubs_generator.docsparser',
+    'kodistubs_generator.swigparser',
+    'concurrent.futures.process',
+)
+
+# Generator run with all outputs up to date in a fresh interpreter
+NOOP_RUN_SCRIPT = f'''
+import json, sys
+from pathlib import Path
+from generator import BuildDirs, build_parser, generate_stubs, get_code_hash
+args = build_parser().parse_args([sys.argv[1]])
+generate_stubs(Path(sys.argv[1]), BuildDirs(Path(sys.argv[2])), args, get_code_hash())
+print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))
+'''
+
+base_dir = Path(__file__).resolve().parent
+build_dir = base_dir / 'build'
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Kodistubs generator benchmark')
+    parser.add_argument('--classes', type=int, default=5, help='Classes per module')
+    parser.add_argument('--methods', type=int, default=10,
+                        help='Methods per class and functions per module')
+    parser.add_argument('--params', type=int, default=4, help='Maximum parameters per function')
+    parser.add_argument('--paragraphs', type=int, default=3,
+                        help='Paragraphs per detailed description')
+    parser.add_argument('--table-rows', type=int, default=4,
+                        help='Table rows per detailed description')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for fixtures')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs of each stage')
+    parser.add_argument('-o', '--output', default=str(build_dir / 'benchmark.json'),
+                        help='Path to JSON report')
+    parser.add_argument('--baseline', help='Path to a baseline JSON report to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='Maximum allowed ratio of stage time to the baseline')
+    parser.add_argument('--fixtures-dir',
+                        help='Directory to keep generated fixtures in instead of a temporary one')
+    parser.add_argument('--startup-budget', type=float,
+                        help='Maximum allowed time in seconds of a generator run '
+                             'with nothing to regenerate')
+    return parser.parse_args()
+
+
+def reset_caches():
+    parse_cache.clear()
+    translation_cache.clear()
+
+
+def time_stage(func, repeat):
+    """
+    Run a benchmark stage several times
+
+    :param func: a callable that runs the stage
+    :param repeat: number of runs
+    :return: dict with the best and the mean time in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        reset_caches()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {'best': min(timings), 'mean': sum(timings) / len(timings)}
+
+
+def run_benchmark(docs_dir, swig_dir, out_dir, repeat):
+    """
+    Time each stage of Kodistubs generation
+
+    :param docs_dir: directory with Doxygen XML fixtures
+    :param swig_dir: directory with SWIG XML fixtures
+    :param out_dir: directory for output files
+    :param repeat: number of runs of each stage
+    :return: dict of stage names and their timings
+    """
+    xml_files = sorted((docs_dir / 'xml').glob('*.xml')) + sorted(swig_dir.glob('*.xml'))
+    group_trees = [etree.parse(str(path)) for path in sorted((docs_dir / 'xml').glob('*.xml'))]
+    descriptions = [elem for tree in group_trees
+                    for elem in tree.iter('briefdescription', 'detaileddescription')]
+    reset_caches()
+    xml_docs = [parse_module_docs(module, docs_dir) for module in MODULES]
+    swig_indexes = [load_swig_index(path) for path in sorted(swig_dir.glob('*.xml'))]
+    decl_types = set()
+    ret_types = set()
+    values = set()
+    for swig_index in swig_indexes:
+        func_defs = list(swig_index['functions'].values())
+        for class_index in swig_index['classes'].values():
+            func_defs += class_index['methods'].values()
+            if class_index['constructor'] is not None:
+                func_defs.append(class_index['constructor'])
+        for func_def in func_defs:
+            if func_def.get('type') is not None:
+                ret_types.add(func_def['type'])
+            for param_def in func_def.get('parmlist', []):
+                decl_types.add(param_def['type'])
+                if param_def.get('value') is not None:
+                    values.add(param_def['value'])
+    module_docs = []
+
+    def match_swig():
+        module_docs.clear()
+        for docs in copy.deepcopy(xml_docs):
+            flatten_module_docs(docs)
+            parse_swig_xml(docs, swig_dir)
+            module_docs.append(docs)
+
+    def clean_types():
+        for decl in decl_types:
+            translate_decl_type(decl)
+        for rtype in ret_types:
+            translate_ret_type(rtype)
+        for value in values:
+            translate_value(value)
+
+    rendered = []
+
+    def render():
+        rendered.clear()
+        for docs in module_docs:
+            _, module_py = render_module(docs)
+            rendered.append((docs.py_name, dumps_module_docs(docs), module_py))
+
+    def write():
+        for name, module_ir, module_py in rendered:
+            (out_dir / (name + '.pickle')).write_bytes(module_ir)
+            (out_dir / (name + '.py')).write_text(module_py, encoding='utf-8')
+
+    match_swig()
+    render()
+    stages = {
+        'xml_load': lambda: [etree.parse(str(path)) for path in xml_files],
+        'description_parsing': lambda: [parse_description(elem) for elem in descriptions],
+        'docs_parsing': lambda: [parse_module_docs(module, docs_dir) for module in MODULES],
+        'swig_matching': match_swig,
+        'type_cleaning': clean_types,
+        'template_rendering': render,
+        'file_writing': write,
+    }
+    return {name: time_stage(func, repeat) for name, func in stages.items()}
+
+
+def run_startup_benchmark(kodi_src, dirs, repeat):
+    """
+    Time generator startup in fresh interpreters
+
+    :param kodi_src: Kodi sources dir with SWIG XML fixtures
+    :param dirs: output directories with Doxygen XML fixtures
+    :param repeat: number of runs
+    :return: a tuple of dict of stage names and their timings
+        and a list of heavy modules imported by a run with nothing
+        to regenerate
+    """
+    src_dir = kodi_src / 'xbmc' / 'interfaces' / 'legacy'
+    src_dir.mkdir(parents=True, exist_ok=True)
+    save_doxy_state(dirs.doxy_state_path, get_doxy_state(src_dir))
+    args = build_parser().parse_args([str(kodi_src), '--force'])
+    generate_stubs(kodi_src, dirs, args, get_code_hash())
+    help_command = [sys.executable, str(base_dir / 'generator.py'), '--help']
+    noop_command = [sys.executable, '-c', NOOP_RUN_SCRIPT, str(kodi_src), str(dirs.root)]
+    output = []
+
+    def run_noop():
+        result = subprocess.run(noop_command, cwd=base_dir, check=True,
+                                stdout=subprocess.PIPE, universal_newlines=True)
+        output.append(result.stdout)
+
+    stages = {
+        'startup_help': time_stage(
+            lambda: subprocess.run(help_command, check=True, stdout=subprocess.DEVNULL), repeat),
+        'startup_noop': time_stage(run_noop, repeat),
+    }
+    return stages, json.loads(output[-1].splitlines()[-1])
+
+
+def compare_reports(report, baseline, threshold):
+    """
+    Compare a benchmark report with a baseline report
+
+    :param report: current report dict
+    :param baseline: baseline report dict
+    :param threshold: maximum allowed ratio of stage time to the baseline
+    :return: list of names of regressed stages
+    """
+    regressions = []
+    print(f'{"stage":<20} {"baseline":>10} {"current":>10} {"ratio":>7}')
+    for name, timings in report['stages'].items():
+        baseline_timings = baseline['stages'].get(name)
+        if baseline_timings is None:
+            print(f'{name:<20} {"-":>10} {timings["best"]:>10.4f} {"-":>7}')
+            continue
+        ratio = timings['best'] / baseline_timings['best'] if baseline_timings['best'] else 0.0
+        mark = ''
+        if ratio > threshold:
+            regressions.append(name)
+            mark = ' !'
+        print(f'{name:<20} {baseline_timings["best"]:>10.4f} {timings["best"]:>10.4f} '
+              f'{ratio:>7.2f}{mark}')
+    return regressions
+
+
+def main():
+    args = parse_arguments()
+    fixtures = {
+        'classes': args.classes,
+        'methods': args.methods,
+        'params': args.params,
+        'paragraphs': args.paragraphs,
+        'table_rows': args.table_rows,
+        'seed': args.seed,
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fixtures_dir = Path(args.fixtures_dir or temp_dir)
+        kodi_src = fixtures_dir / 'kodi'
+        swig_dir = kodi_src / 'build' / 'swig'
+        dirs = BuildDirs(fixtures_dir / 'build')
+        out_dir = Path(temp_dir) / 'out'
+        out_dir.mkdir()
+        print('Generating fixtures...')
+        FixtureBuilder(**fixtures).build(dirs.docs_dir, swig_dir)
+        print('Running benchmark...')
+        stages = run_benchmark(dirs.docs_dir, swig_dir, out_dir, args.repeat)
+        print('Running startup benchmark...')
+        startup_stages, startup_imports = run_startup_benchmark(kodi_src, dirs, args.repeat)
+        stages.update(startup_stages)
+    report = {
+        'version': REPORT_VERSION,
+        'python': platform.python_version(),
+        'fixtures': fixtures,
+        'repeat': args.repeat,
+        'stages': stages,
+        'startup_imports': startup_imports,
+    }
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open('w', encoding='utf-8') as fo:
+        json.dump(report, fo, indent=2)
+    for name, timings in stages.items():
+        print(f'{name:<20} {timings["best"]:>10.4f} s')
+    print(f'Report saved to {output_path}')
+    failed = False
+    if startup_imports:
+        print(f'Warning: heavy modules imported by a no-op run: {", ".join(startup_imports)}')
+    if args.startup_budget is not None and stages['startup_noop']['best'] > args.startup_budget:
+        print(f'No-op run exceeds the startup budget of {args.startup_budget} s')
+        failed = True
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as fo:
+            baseline = json.load(fo)
+        if baseline.get('fixtures') != fixtures:
+            print('Warning: baseline was created with different fixtures')
+        if compare_reports(report, baseline, args.threshold):
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
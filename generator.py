@@ -5,68 +5,719 @@ Script for semi-automated generation of
 `Kodistubs <https://github.com/romanvm/Kodistubs>`_ from Kodi source files.
 """
 
+# Parsers, lxml, Jinja and multiprocessing are imported only when they are needed,
+# so that --help and runs with nothing to regenerate start fast. Modules that
+# hash or scan inputs import lxml and are imported only by generation code.
+
 import argparse
 import json
+import shutil
+from itertools import repeat
 from pathlib import Path
-from subprocess import run
-
-from jinja2 import Environment, FileSystemLoader
+from subprocess import STDOUT, Popen, run
 
-from kodistubs_generator.docsparser import parse
+from kodistubs_generator.cache import parse_cache, translation_cache
+from kodistubs_generator.intermediate import dumps_module_docs, load_module_docs
+from kodistubs_generator.modules import MODULES, SQLITE3_DB
+from kodistubs_generator.profiling import profiler
 
 base_dir = Path(__file__).resolve().parent
 template_dir = base_dir / 'kodistubs_generator'
 build_dir = base_dir / 'build'
-kodistubs_dir = build_dir / 'Kodistubs'
-json_dir = build_dir / 'json'
-docs_dir = build_dir / 'kodi-docs'
-doxy_path = build_dir / 'kodi.doxy'
-jinja_env = Environment(loader=FileSystemLoader(template_dir))
+xml_cache_path = build_dir / 'xml_cache.pickle'
+translation_cache_path = build_dir / 'translation_cache.pickle'
+profile_path = build_dir / 'profile.json'
+profile_stats_path = build_dir / 'profile.pstats'
+template_cache_dir = build_dir / 'template_cache'
+jinja_env = None
+use_template_cache = False
 
 
-def parse_arguments():
+class BuildDirs:
+    """
+    Output directories and state files for a single Kodi source tree
+
+    :param root: root output directory
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.kodistubs_dir = root / 'Kodistubs'
+        self.json_dir = root / 'json'
+        self.ir_dir = root / 'ir'
+        self.docs_dir = root / 'kodi-docs'
+        self.doxy_path = root / 'kodi.doxy'
+        self.doxy_shards_dir = root / 'kodi-docs-shards'
+        self.doxy_state_path = root / 'kodi.doxy.json'
+        self.manifest_path = root / 'manifest.json'
+        self.archive_path = root / 'Kodistubs.zip'
+        self.dropped_path = root / 'dropped_symbols.json'
+        self.header_diff_path = root / 'header_docs.diff'
+
+    def create(self, debug_json=False, archive=False):
+        self.ir_dir.mkdir(parents=True, exist_ok=True)
+        if not archive:
+            self.kodistubs_dir.mkdir(exist_ok=True)
+        if debug_json:
+            self.json_dir.mkdir(exist_ok=True)
+
+
+def build_parser():
+    """
+    Create the command line parser of the generator
+
+    :return: :class:`argparse.ArgumentParser` instance
+    """
     parser = argparse.ArgumentParser(description='Kodistubs generator')
-    parser.add_argument('kodi_src', nargs='?', help='Kodi sources dir')
+    parser.add_argument('kodi_src', nargs='*',
+                        help='Kodi sources dir. If several dirs are given, stubs for each '
+                             'of them are written to build/<dir name>')
+    parser.add_argument('-b', '--batch',
+                        help='Path to a JSON file with a mapping of Kodi versions to '
+                             'Kodi sources dirs. Stubs for each version are written '
+                             'to build/<version>')
     parser.add_argument('-o', '--overwrite', action='store_true',
                         help='Overwrite Doxygen docs')
-    return parser.parse_args()
+    parser.add_argument('-s', '--scope-doxygen', action='store_true',
+                        help='Run Doxygen only on headers that define groups '
+                             'of Kodi Python modules')
+    parser.add_argument('--doxygen-jobs', type=int, default=1,
+                        help='Number of parallel Doxygen processes. Doxygen inputs '
+                             'are split into shards and their XML outputs are merged')
+    parser.add_argument('--doxygen-backend', choices=('xml', 'sqlite3', 'headers'),
+                        default='xml',
+                        help='Doxygen output format to read module docs from. '
+                             '"headers" reads docs directly from Kodi headers '
+                             'without running Doxygen')
+    parser.add_argument('--compare-headers', action='store_true',
+                        help='Compare module docs read directly from Kodi headers '
+                             'with Doxygen output and save the differences '
+                             'to build/header_docs.diff')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of worker processes for parsing and '
+                             'rendering modules, or for processing source trees '
+                             'in batch mode')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='Regenerate all modules even if their inputs '
+                             'have not changed')
+    parser.add_argument('-a', '--archive', action='store_true',
+                        help='Write Python stubs to build/Kodistubs.zip archive '
+                             'instead of build/Kodistubs directory')
+    parser.add_argument('--debug-json', action='store_true',
+                        help='Also save parsed module docs as indented JSON to build/json')
+    parser.add_argument('--xml-cache', action='store_true',
+                        help='Persist parsed XML files between runs')
+    parser.add_argument('--xml-cache-size', type=int, default=512,
+                        help='Maximum number of parsed XML files kept in cache')
+    parser.add_argument('--translation-cache', action='store_true',
+                        help='Persist translated SWIG types and values between runs')
+    parser.add_argument('--translation-cache-size', type=int, default=4096,
+                        help='Maximum number of translated SWIG types and values '
+                             'kept in cache')
+    parser.add_argument('--profile', action='store_true',
+                        help='Save per-stage timing and memory report '
+                             'to build/profile.json')
+    parser.add_argument('--profile-stats', action='store_true',
+                        help='Also save cProfile statistics to '
+                             'build/profile.pstats (implies --profile)')
+    parser.add_argument('--template-cache', action='store_true',
+                        help='Persist compiled templates in build/template_cache '
+                             'between runs')
+    return parser
+
+
+def parse_arguments():
+    parser = build_parser()
+    args = parser.parse_args()
+    if not args.kodi_src and not args.batch:
+        parser.error('Kodi sources dir or --batch option is required')
+    if args.compare_headers and args.doxygen_backend == 'headers':
+        parser.error('--compare-headers requires Doxygen output')
+    return args
 
 
-def create_doxyfile(src_dir):
-    kodi_doxy = jinja_env.get_template('kodi.doxy.tpl')
+def get_source_trees(args):
+    """
+    Get Kodi source trees to generate stubs for
+
+    :param args: parsed command line arguments
+    :return: dict of versions and Kodi sources dirs. A single tree given
+        without --batch option has ``None`` version.
+    """
+    if len(args.kodi_src) == 1 and not args.batch:
+        return {None: Path(args.kodi_src[0])}
+    trees = {}
+    if args.batch:
+        batch_path = Path(args.batch)
+        with batch_path.open('r', encoding='utf-8') as fo:
+            batch = json.load(fo)
+        for version, kodi_src in batch.items():
+            # Relative paths are relative to the batch file
+            trees[version] = batch_path.parent / kodi_src
+    for kodi_src in map(Path, args.kodi_src):
+        version = kodi_src.resolve().name
+        if version in trees:
+            raise SystemExit(f'Error: duplicate Kodi version {version}')
+        trees[version] = kodi_src
+    for version in trees:
+        if version in ('', '.', '..') or '/' in version or '\\' in version:
+            raise SystemExit(f'Error: invalid Kodi version {version}')
+    return trees
+
+
+def get_jinja_env():
+    """
+    Get Jinja environment, creating it on first use
+
+    :return: Jinja environment
+    """
+    global jinja_env
+    if jinja_env is None:
+        from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+        bytecode_cache = None
+        if use_template_cache:
+            template_cache_dir.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(template_cache_dir))
+        # Templates do not change during a run, so they are not checked for updates
+        jinja_env = Environment(loader=FileSystemLoader(template_dir), auto_reload=False,
+                                bytecode_cache=bytecode_cache)
+    return jinja_env
+
+
+def create_doxyfile(dirs, src_dir, input_files=None, backend='xml', shard=None):
+    """
+    Render a Doxygen config file
+
+    :param dirs: output directories
+    :param src_dir: directory with Kodi Python API sources
+    :param input_files: list of input files or ``None`` for all files in ``src_dir``
+    :param backend: Doxygen output format, ``'xml'`` or ``'sqlite3'``
+    :param shard: shard number for a sharded XML-only Doxygen run
+    :return: path to the config file
+    """
+    if shard is None:
+        doxy_path, out_dir = dirs.doxy_path, dirs.docs_dir
+    else:
+        doxy_path = dirs.doxy_shards_dir / f'kodi.{shard}.doxy'
+        out_dir = dirs.doxy_shards_dir / str(shard)
+    kodi_doxy = get_jinja_env().get_template('kodi.doxy.tpl')
     with doxy_path.open('w', encoding='utf-8') as fo:
-        fo.write(kodi_doxy.render(src_dir=src_dir, out_dir=docs_dir))
+        fo.write(kodi_doxy.render(src_dir=src_dir, input_files=input_files, out_dir=out_dir,
+                                  sqlite3=backend == 'sqlite3', xml_only=shard is not None))
+    return doxy_path
 
 
-def generate_doxy_docs():
-    run(['doxygen', str(doxy_path)])
+def get_doxy_state(src_dir, scoped=False, backend='xml'):
+    """
+    Get the state of Doxygen inputs that decides if Doxygen has to be run again
 
+    :param src_dir: directory with Kodi Python API sources
+    :param scoped: Doxygen is run only on headers that define module groups
+    :param backend: Doxygen output format, ``'xml'`` or ``'sqlite3'``
+    :return: state dict
+    """
+    from kodistubs_generator.doxygen import hash_sources
+    from kodistubs_generator.manifest import hash_file
+    return {
+        'src_dir': str(src_dir),
+        'scoped': scoped,
+        'backend': backend,
+        'template': hash_file(template_dir / 'kodi.doxy.tpl'),
+        'sources': hash_sources(src_dir),
+    }
 
-def main():
-    print('Generating Kodistubs...')
-    if not build_dir.exists():
-        build_dir.mkdir()
-        kodistubs_dir.mkdir()
-        json_dir.mkdir()
-    args = parse_arguments()
-    kodi_src = Path(args.kodi_src)
+
+def generate_doxy_docs(dirs):
+    return run(['doxygen', str(dirs.doxy_path)]).returncode == 0
+
+
+def generate_sharded_doxy_docs(dirs, src_dir, input_files=None, jobs=2):
+    """
+    Run Doxygen in parallel processes over shards of its inputs
+    and merge their XML outputs
+
+    Only XML output is generated. The output of each Doxygen process
+    is saved to a log file in the shards directory.
+
+    :param dirs: output directories
+    :param src_dir: directory with Kodi Python API sources
+    :param input_files: list of input files or ``None`` for all files in ``src_dir``
+    :param jobs: number of Doxygen processes
+    :return: True if all Doxygen processes succeeded
+    """
+    from kodistubs_generator.doxygen import collect_doxygen_inputs, merge_doxy_xml, shard_inputs
+    if input_files is None:
+        input_files = collect_doxygen_inputs(src_dir)
+    shards = shard_inputs(input_files, jobs)
+    shutil.rmtree(dirs.doxy_shards_dir, ignore_errors=True)
+    dirs.doxy_shards_dir.mkdir(parents=True)
+    print(f'Running Doxygen on {len(shards)} shards...')
+    processes = []
+    for shard, shard_files in enumerate(shards):
+        doxy_path = create_doxyfile(dirs, src_dir, shard_files, shard=shard)
+        log_path = dirs.doxy_shards_dir / f'kodi.{shard}.log'
+        with log_path.open('wb') as log:
+            processes.append((log_path, Popen(['doxygen', str(doxy_path)], stdout=log,
+                                              stderr=STDOUT)))
+    failed = [log_path for log_path, process in processes if process.wait() != 0]
+    if failed:
+        for log_path in failed:
+            print(f'Doxygen failed, see {log_path}')
+        return False
+    xml_dir = dirs.docs_dir / 'xml'
+    shutil.rmtree(xml_dir, ignore_errors=True)
+    merge_doxy_xml([dirs.doxy_shards_dir / str(shard) / 'xml' for shard in range(len(shards))],
+                   xml_dir)
+    shutil.rmtree(dirs.doxy_shards_dir)
+    return True
+
+
+def enable_template_cache():
+    global use_template_cache
+    use_template_cache = True
+
+
+def init_worker(profile=False, template_cache=False, parsed=None, translations=None):
+    """
+    Initialize a worker process for building modules or source trees
+
+    :param profile: enable profiling in the worker
+    :param template_cache: use the persistent template cache in the worker
+    :param parsed: snapshot of the XML parse cache of the parent process
+    :param translations: snapshot of the translation cache of the parent process
+    """
+    if profile:
+        profiler.start()
+    if template_cache:
+        enable_template_cache()
+    if parsed is not None:
+        parse_cache.seed(parsed)
+    if translations is not None:
+        translation_cache.seed(translations)
+
+
+def get_worker_initargs():
+    """
+    Get arguments of :func:`init_worker` that pass the state of this process
+
+    :return: a tuple of arguments
+    """
+    return (profiler.enabled, use_template_cache, parse_cache.snapshot(),
+            translation_cache.snapshot())
+
+
+def collect_worker_data():
+    """
+    Collect profiling data, newly parsed files and translations in a worker process
+
+    :return: a tuple of profiling data, parse cache data and translation cache data
+    """
+    return profiler.collect(), parse_cache.collect(), translation_cache.collect()
+
+
+def merge_worker_data(data):
+    """
+    Merge data collected by :func:`collect_worker_data` in a worker process
+
+    :param data: a tuple of profiling data, parse cache data and translation cache data
+    """
+    profile_data, parsed, translations = data
+    if profiler.enabled:
+        profiler.merge(profile_data)
+    parse_cache.merge(parsed)
+    translation_cache.merge(translations)
+
+
+def render_module(mod, debug_json=False):
+    """
+    Render a Python stub for a Kodi Python API module
+
+    :param mod: :class:`ModuleDocs` object
+    :param debug_json: also dump module docs to indented JSON
+    :return: a tuple of JSON docs or ``None`` and Python stub contents
+    """
+    template_py = get_jinja_env().get_template('module.py.tpl')
+    module_json = json.dumps(mod.to_dict(), indent=2) if debug_json else None
+    return module_json, template_py.render(module=mod)
+
+
+def get_module_outputs(mod, module, debug_json=False):
+    """
+    Serialize and render parsed docs of a Kodi Python API module
+
+    :param mod: :class:`ModuleDocs` object
+    :param module: module group XML file name
+    :param debug_json: also dump module docs to indented JSON
+    :return: a tuple of module name, list of dropped symbols as dicts,
+        intermediate data, JSON docs or ``None`` and Python stub contents
+    """
+    dropped = [symbol._asdict() for symbol in mod.dropped]
+    with profiler.stage('render', module):
+        return (mod.py_name, dropped, dumps_module_docs(mod)) + render_module(mod, debug_json)
+
+
+def build_module(module, docs_dir, swig_dir, debug_json=False, backend='xml'):
+    """
+    Parse and render a single Kodi Python API module
+
+    :param module: module group XML file name
+    :param docs_dir: directory where Doxygen docs are located, or the directory
+        with Kodi Python API sources for ``'headers'`` backend
+    :param swig_dir: directory where SWIG XML definitions are located
+    :param debug_json: also dump module docs to indented JSON
+    :param backend: docs source, ``'xml'``, ``'sqlite3'`` or ``'headers'``
+    :return: :func:`get_module_outputs` result
+    """
+    from kodistubs_generator.docsparser import parse_module
+    return get_module_outputs(parse_module(module, docs_dir, swig_dir, backend), module,
+                              debug_json)
+
+
+def build_module_in_worker(module, docs_dir, swig_dir, debug_json=False, backend='xml'):
+    """
+    Build a module in a worker process and collect the data
+    that has to be merged in the parent process
+
+    :param module: module group XML file name
+    :param docs_dir: directory where Doxygen docs are located, or the directory
+        with Kodi Python API sources for ``'headers'`` backend
+    :param swig_dir: directory where SWIG XML definitions are located
+    :param debug_json: also dump module docs to indented JSON
+    :param backend: docs source, ``'xml'``, ``'sqlite3'`` or ``'headers'``
+    :return: a tuple of :func:`build_module` result and
+        :func:`collect_worker_data` result
+    """
+    return build_module(module, docs_dir, swig_dir, debug_json, backend), collect_worker_data()
+
+
+def build_modules(modules, docs_dir, swig_dir, jobs=1, debug_json=False, backend='xml'):
+    """
+    Build Kodi Python API modules, optionally in parallel worker processes
+
+    :param modules: list of module group XML file names
+    :param docs_dir: directory where Doxygen docs are located, or the directory
+        with Kodi Python API sources for ``'headers'`` backend
+    :param swig_dir: directory where SWIG XML definitions are located
+    :param jobs: number of worker processes
+    :param debug_json: also dump module docs to indented JSON
+    :param backend: docs source, ``'xml'``, ``'sqlite3'`` or ``'headers'``
+    :return: generator of tuples of module group XML file name and
+        :func:`build_module` result in the order of ``modules``
+    """
+    if jobs > 1 and len(modules) > 1:
+        # Modules are independent, but results are yielded in the original order
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                 initargs=get_worker_initargs()) as executor:
+            for module, (result, worker_data) in zip(
+                    modules, executor.map(build_module_in_worker, modules, repeat(docs_dir),
+                                         repeat(swig_dir), repeat(debug_json),
+                                         repeat(backend))):
+                merge_worker_data(worker_data)
+                yield module, result
+    elif modules:
+        # Each module is rendered and handed over to the writer right after
+        # it is parsed, and no reference to its parsed docs is kept
+        from kodistubs_generator.docsparser import iter_parse
+        parsed = iter_parse(docs_dir, swig_dir, modules, backend)
+        for module in modules:
+            yield module, get_module_outputs(next(parsed), module, debug_json)
+
+
+def write_module(writer, dirs, name, module_ir, module_json, module_py):
+    print(f'Writing {name}...')
+    if module_ir is not None:
+        writer.write(dirs.ir_dir / (name + '.pickle'), module_ir)
+    if module_json is not None:
+        writer.write(dirs.json_dir / (name + '.json'), module_json)
+    writer.write(dirs.kodistubs_dir / (name + '.py'), module_py, encoding='utf-8')
+
+
+def write_dropped_report(writer, dirs, manifest):
+    """
+    Write a report of documented symbols that are missing from SWIG definitions
+
+    The report covers all modules in the manifest, so reports of different
+    Kodi versions can be compared to track API changes.
+
+    :param writer: :class:`OutputWriter` instance
+    :param dirs: output directories
+    :param manifest: manifest of the current generation
+    """
+    dropped = []
+    for module in MODULES:
+        entry = manifest['modules'].get(module)
+        if entry is not None:
+            dropped += entry.get('dropped', [])
+    writer.write(dirs.dropped_path, json.dumps(dropped, indent=2) + '\n', encoding='utf-8')
+    if dropped:
+        print(f'{len(dropped)} documented symbols not found in SWIG XML, '
+              f'see {dirs.dropped_path}')
+
+
+def get_code_hash():
+    """
+    Get a combined hash of the generator code
+
+    :return: hex digest
+    """
+    from kodistubs_generator.manifest import hash_files
+    code_files = [Path(__file__).resolve()]
+    code_files += template_dir.rglob('*.py')
+    return hash_files(code_files)
+
+
+def get_template_hash():
+    """
+    Get a combined hash of the templates
+
+    :return: hex digest
+    """
+    from kodistubs_generator.manifest import hash_files
+    return hash_files(template_dir.glob('*.tpl'))
+
+
+def select_modules(dirs, writer, manifest, docs_dir, swig_dir, force=False, rerender=False,
+                   debug_json=False, backend='xml'):
+    """
+    Select modules that need to be regenerated
+
+    Modules whose inputs have not changed are rendered again from their
+    intermediate data if templates have changed or if output files are missing.
+
+    :param dirs: output directories
+    :param writer: :class:`OutputWriter` instance
+    :param manifest: manifest of the previous generation
+    :param docs_dir: directory where Doxygen docs are located, or the directory
+        with Kodi Python API sources for ``'headers'`` backend
+    :param swig_dir: directory where SWIG XML definitions are located
+    :param force: parse all modules regardless of the manifest
+    :param rerender: render all modules that are not parsed
+    :param debug_json: JSON docs are required outputs
+    :param backend: docs source, ``'xml'``, ``'sqlite3'`` or ``'headers'``
+    :return: a tuple of dict of module group XML file names that need to be
+        parsed and their input file hashes, and a list of module names
+        that only need to be rendered
+    """
+    from kodistubs_generator.manifest import collect_module_inputs
+    selected = {}
+    rendered = []
+    for module in MODULES:
+        inputs = collect_module_inputs(module, docs_dir, swig_dir, backend)
+        entry = manifest['modules'].get(module)
+        if (force or entry is None or entry['inputs'] != inputs
+                or not (dirs.ir_dir / (entry['name'] + '.pickle')).exists()):
+            selected[module] = inputs
+        elif (rerender or not writer.exists(dirs.kodistubs_dir / (entry['name'] + '.py'))
+                or debug_json and not (dirs.json_dir / (entry['name'] + '.json')).exists()):
+            rendered.append(entry['name'])
+        else:
+            print(f'Skipping {entry["name"]}: no changes')
+    return selected, rendered
+
+
+def compare_header_docs(dirs, src_dir, backend='xml'):
+    """
+    Compare module docs read directly from Kodi headers with Doxygen output
+
+    Differences of module docs as JSON are saved as a unified diff.
+
+    :param dirs: output directories
+    :param src_dir: directory with Kodi Python API sources
+    :param backend: Doxygen output format, ``'xml'`` or ``'sqlite3'``
+    :return: True if docs of all modules match
+    """
+    from difflib import unified_diff
+    from kodistubs_generator.docsparser import parse_module_docs
+    diff = []
+    for module in MODULES:
+        module_json = {}
+        for source, docs_dir in ((backend, dirs.docs_dir), ('headers', src_dir)):
+            try:
+                module_docs = parse_module_docs(module, docs_dir, source).to_dict()
+            except ValueError as exc:
+                module_docs = {'error': str(exc)}
+            module_json[source] = json.dumps(module_docs, indent=2).splitlines(keepends=True)
+        module_diff = list(unified_diff(module_json[backend], module_json['headers'],
+                                        f'{backend}/{module}', f'headers/{module}'))
+        if module_diff:
+            print(f'Header docs of {module} differ: {len(module_diff)} diff lines')
+        else:
+            print(f'Header docs of {module} match')
+        diff += module_diff
+    with dirs.header_diff_path.open('w', encoding='utf-8') as fo:
+        fo.writelines(diff)
+    print(f'Header docs differences saved to {dirs.header_diff_path}')
+    return not diff
+
+
+def generate_stubs(kodi_src, dirs, args, code_hash, jobs=1):
+    """
+    Generate Kodistubs for a single Kodi source tree
+
+    :param kodi_src: Kodi sources dir
+    :param dirs: output directories
+    :param args: parsed command line arguments
+    :param code_hash: hash of the generator code
+    :param jobs: number of worker processes for building modules
+    """
+    from kodistubs_generator.doxygen import (collect_module_headers, load_doxy_state,
+                                             save_doxy_state)
+    from kodistubs_generator.manifest import MANIFEST_VERSION, load_manifest, save_manifest
+    from kodistubs_generator.writer import OutputWriter
+    dirs.create(args.debug_json, args.archive)
     src_dir = kodi_src / 'xbmc' / 'interfaces' / 'legacy'
     swig_dir = kodi_src / 'build' / 'swig'
     if not swig_dir.exists():
         swig_dir = kodi_src / 'build' / 'build' / 'swig'
-    if args.overwrite or not (docs_dir / 'xml').exists():
-        create_doxyfile(src_dir)
-        generate_doxy_docs()
-    template_py = jinja_env.get_template('module.py.tpl')
-    module_docs = parse(docs_dir, swig_dir)
-    for mod in module_docs:
-        print(f'Writing {mod["__name__"]}...')
-        with (json_dir / (mod['__name__'] + '.json')).open('w') as fo:
-            json.dump(mod, fo, indent=2)
-        module_py = template_py.render(module=mod)
-        with (kodistubs_dir / (mod['__name__'] + '.py')).open('w',
-                  encoding='utf-8') as fo:
-            fo.write(module_py)
+    backend = args.doxygen_backend
+    if backend == 'headers':
+        print('Skipping Doxygen: reading docs from Kodi headers')
+        docs_dir = src_dir
+    else:
+        docs_dir = dirs.docs_dir
+        doxy_state = get_doxy_state(src_dir, args.scope_doxygen, backend)
+        doxy_output = docs_dir / (SQLITE3_DB if backend == 'sqlite3' else 'xml')
+        if (args.overwrite or not doxy_output.exists()
+                or load_doxy_state(dirs.doxy_state_path) != doxy_state):
+            with profiler.stage('doxygen'):
+                input_files = collect_module_headers(src_dir) if args.scope_doxygen else None
+                if args.doxygen_jobs > 1 and backend == 'xml':
+                    doxygen_ok = generate_sharded_doxy_docs(dirs, src_dir, input_files,
+                                                            args.doxygen_jobs)
+                else:
+                    if args.doxygen_jobs > 1:
+                        print('Sharded Doxygen runs support only XML output, '
+                              'running a single Doxygen process')
+                    create_doxyfile(dirs, src_dir, input_files, backend)
+                    doxygen_ok = generate_doxy_docs(dirs)
+            if doxygen_ok:
+                save_doxy_state(dirs.doxy_state_path, doxy_state)
+        else:
+            print('Skipping Doxygen: Kodi sources and Doxygen config have not changed')
+        if args.compare_headers:
+            compare_header_docs(dirs, src_dir, backend)
+    manifest = load_manifest(dirs.manifest_path)
+    if manifest['code'] != code_hash:
+        manifest = {'version': MANIFEST_VERSION, 'code': code_hash, 'templates': None,
+                    'modules': {}}
+    template_hash = get_template_hash()
+    archive_path = dirs.archive_path if args.archive else None
+    # Files are written in a background thread while next modules are built
+    with OutputWriter(archive_path, dirs.kodistubs_dir) as writer:
+        modules, rendered = select_modules(dirs, writer, manifest, docs_dir, swig_dir,
+                                           args.force, manifest['templates'] != template_hash,
+                                           args.debug_json, backend)
+        for name in rendered:
+            mod = load_module_docs(dirs.ir_dir / (name + '.pickle'))
+            with profiler.stage('render', name):
+                result = render_module(mod, args.debug_json)
+            write_module(writer, dirs, name, None, *result)
+        for module, (name, dropped, *outputs) in build_modules(
+                list(modules), docs_dir, swig_dir, jobs, args.debug_json, backend):
+            write_module(writer, dirs, name, *outputs)
+            manifest['modules'][module] = {'name': name, 'inputs': modules[module],
+                                           'dropped': dropped}
+        write_dropped_report(writer, dirs, manifest)
+        # Writing overlaps rendering, so waiting for the writer
+        # and writing itself are reported as separate stages
+        with profiler.stage('write_wait'):
+            writer.close()
+    profiler.add_stage('write', writer.write_time)
+    # The manifest is saved only after all outputs are written
+    manifest['templates'] = template_hash
+    save_manifest(dirs.manifest_path, manifest)
+
+
+def generate_version(version, kodi_src, args, code_hash, jobs=1):
+    """
+    Generate Kodistubs for a Kodi version in batch mode
+
+    :param version: Kodi version used as the output directory name
+    :param kodi_src: Kodi sources dir
+    :param args: parsed command line arguments
+    :param code_hash: hash of the generator code
+    :param jobs: number of worker processes for building modules
+    """
+    print(f'Generating Kodistubs {version}...')
+    generate_stubs(kodi_src, BuildDirs(build_dir / version), args, code_hash, jobs)
+    print(f'Kodistubs {version} done')
+
+
+def generate_version_in_worker(version, kodi_src, args, code_hash):
+    """
+    Generate Kodistubs for a Kodi version in a worker process
+    and collect the data that has to be merged in the parent process
+
+    :return: :func:`collect_worker_data` result
+    """
+    generate_version(version, kodi_src, args, code_hash)
+    return collect_worker_data()
+
+
+def generate_batch(trees, args, code_hash):
+    """
+    Generate Kodistubs for several Kodi versions
+
+    Source trees are processed in parallel worker processes if --jobs
+    option is given, otherwise modules of each tree are built one by one.
+    Parsing caches and the template environment are shared by all trees
+    processed in the same process.
+
+    :param trees: dict of Kodi versions and Kodi sources dirs
+    :param args: parsed command line arguments
+    :param code_hash: hash of the generator code
+    """
+    if args.jobs > 1 and len(trees) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=args.jobs, initializer=init_worker,
+                                 initargs=get_worker_initargs()) as executor:
+            for worker_data in executor.map(generate_version_in_worker, trees, trees.values(),
+                                            repeat(args), repeat(code_hash)):
+                merge_worker_data(worker_data)
+    else:
+        for version, kodi_src in trees.items():
+            generate_version(version, kodi_src, args, code_hash, args.jobs)
+
+
+def print_translation_stats():
+    """
+    Print hit and miss statistics of SWIG type and value translations
+    done in this process and in worker processes
+    """
+    for name, stats in translation_cache.stats().items():
+        print(f'{name}: {stats["hits"]} cache hits, {stats["misses"]} misses')
+
+
+def main():
+    print('Generating Kodistubs...')
+    args = parse_arguments()
+    trees = get_source_trees(args)
+    build_dir.mkdir(exist_ok=True)
+    if args.profile or args.profile_stats:
+        profiler.start(cprofile=args.profile_stats)
+    if args.template_cache:
+        enable_template_cache()
+    code_hash = get_code_hash()
+    parse_cache.maxsize = args.xml_cache_size
+    if args.xml_cache:
+        parse_cache.load(xml_cache_path, code_hash)
+    translation_cache.maxsize = args.translation_cache_size
+    if args.translation_cache:
+        translation_cache.load(translation_cache_path, code_hash)
+    if None in trees:
+        generate_stubs(trees[None], BuildDirs(build_dir), args, code_hash, args.jobs)
+    else:
+        generate_batch(trees, args, code_hash)
+    if args.xml_cache:
+        parse_cache.save(xml_cache_path, code_hash)
+    if args.translation_cache:
+        translation_cache.save(translation_cache_path, code_hash)
+    print_translation_stats()
+    if profiler.enabled:
+        profiler.stop()
+        profiler.save(profile_path, profile_stats_path if args.profile_stats else None)
+        print(f'Profiling report saved to {profile_path}')
     print('Done')
 
 
@@ -0,0 +1,292 @@
+"""
+Bounded LRU caches for results of parsing Doxygen and SWIG XML files
+and of translating SWIG types and values to Python
+"""
+import pickle
+from collections import Counter, OrderedDict
+from functools import wraps
+
+CACHE_VERSION = 1
+
+
+class ParseCache:
+    """
+    LRU cache of parsed XML files
+
+    Entries are keyed by the kind of parsed results, file path, modification
+    time and size, so a modified file is always parsed again. Results are
+    stored pickled, and every lookup returns a fresh copy that can be safely
+    modified by the caller.
+
+    :param maxsize: maximum number of cached files
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._new_keys = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, kind, path, parse_func):
+        """
+        Get parsing results for a file, parsing the file on a cache miss
+
+        :param kind: kind of parsing results, e.g. ``'group'`` or ``'swig'``
+        :param path: path to a XML file
+        :param parse_func: function that takes the file path
+            and returns parsing results
+        :return: parsing results
+        """
+        file_stat = path.stat()
+        key = (kind, str(path), file_stat.st_mtime_ns, file_stat.st_size)
+        data = self._entries.get(key)
+        if data is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return pickle.loads(data)
+        self.misses += 1
+        result = parse_func(path)
+        self._put(key, pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+        self._new_keys.add(key)
+        return result
+
+    def _put(self, key, data):
+        # Drop outdated entries for the same file
+        for old_key in [k for k in self._entries if k[:2] == key[:2]]:
+            del self._entries[old_key]
+            self._new_keys.discard(old_key)
+        self._entries[key] = data
+        while len(self._entries) > self.maxsize:
+            self._new_keys.discard(self._entries.popitem(last=False)[0])
+
+    def clear(self):
+        self._entries.clear()
+        self._new_keys.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def snapshot(self):
+        """
+        Get the cache size and entries to seed the cache of a worker process
+
+        :return: a tuple of maximum size and dict of entries
+        """
+        return self.maxsize, dict(self._entries)
+
+    def seed(self, snapshot):
+        """
+        Replace cache contents with a snapshot of the cache of the parent process
+
+        :param snapshot: :meth:`snapshot` result
+        """
+        self.clear()
+        self.maxsize, entries = snapshot
+        self._entries.update(entries)
+
+    def collect(self):
+        """
+        Collect and reset files parsed in this process and statistics,
+        e.g. in a worker process
+
+        :return: a tuple of dict of new entries, hits and misses
+        """
+        data = ({key: self._entries[key] for key in self._new_keys}, self.hits, self.misses)
+        self._new_keys.clear()
+        self.hits = 0
+        self.misses = 0
+        return data
+
+    def merge(self, data):
+        """
+        Merge parsed files and statistics collected by :meth:`collect`
+        in another process
+
+        :param data: a tuple of dict of new entries, hits and misses
+        """
+        entries, hits, misses = data
+        for key, value in entries.items():
+            self._put(key, value)
+        self.hits += hits
+        self.misses += misses
+
+    def load(self, cache_path, tag):
+        """
+        Load cache entries persisted by a previous run
+
+        :param cache_path: path to a cache file
+        :param tag: tag that identifies parser code version; entries saved
+            with a different tag are discarded
+        """
+        try:
+            with cache_path.open('rb') as fo:
+                data = pickle.load(fo)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return
+        if (not isinstance(data, dict) or data.get('version') != CACHE_VERSION
+                or data.get('tag') != tag):
+            return
+        for key, value in data['entries'].items():
+            self._put(key, value)
+
+    def save(self, cache_path, tag):
+        """
+        Persist cache entries for next runs
+
+        :param cache_path: path to a cache file
+        :param tag: tag that identifies parser code version
+        """
+        with cache_path.open('wb') as fo:
+            pickle.dump({'version': CACHE_VERSION, 'tag': tag, 'entries': self._entries},
+                        fo, pickle.HIGHEST_PROTOCOL)
+
+
+class TranslationCache:
+    """
+    LRU cache of results of SWIG type and value translators
+
+    The cache is shared by all memoized functions and is keyed by the function
+    name and its argument. Hits and misses are counted per function, so a high
+    number of misses shows new SWIG type spellings.
+
+    :param maxsize: maximum number of cached translations
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = Counter()
+        self.misses = Counter()
+        self._entries = OrderedDict()
+        self._new_keys = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def memoize(self, func):
+        """
+        Decorate a function of a single hashable argument to cache its results
+
+        :param func: a function to wrap
+        :return: wrapped function
+        """
+        name = func.__name__
+
+        @wraps(func)
+        def wrapper(arg):
+            key = (name, arg)
+            try:
+                result = self._entries[key]
+            except KeyError:
+                self.misses[name] += 1
+                result = self._entries[key] = func(arg)
+                self._new_keys.add(key)
+                self._trim()
+                return result
+            self.hits[name] += 1
+            self._entries.move_to_end(key)
+            return result
+
+        return wrapper
+
+    def stats(self):
+        """
+        Get hit and miss statistics of memoized functions
+
+        :return: dict of function names and dicts with hits and misses
+        """
+        return {name: {'hits': self.hits[name], 'misses': self.misses[name]}
+                for name in sorted(self.hits.keys() | self.misses.keys())}
+
+    def _trim(self):
+        while len(self._entries) > self.maxsize:
+            self._new_keys.discard(self._entries.popitem(last=False)[0])
+
+    def clear(self):
+        self._entries.clear()
+        self._new_keys.clear()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def snapshot(self):
+        """
+        Get the cache size and entries to seed the cache of a worker process
+
+        :return: a tuple of maximum size and dict of entries
+        """
+        return self.maxsize, dict(self._entries)
+
+    def seed(self, snapshot):
+        """
+        Replace cache contents with a snapshot of the cache of the parent process
+
+        :param snapshot: :meth:`snapshot` result
+        """
+        self.clear()
+        self.maxsize, entries = snapshot
+        self._entries.update(entries)
+
+    def collect(self):
+        """
+        Collect and reset translations and statistics of this process,
+        e.g. in a worker process
+
+        :return: a tuple of dict of new entries, hits and misses
+        """
+        data = ({key: self._entries[key] for key in self._new_keys},
+                dict(self.hits), dict(self.misses))
+        self._new_keys.clear()
+        self.hits = Counter()
+        self.misses = Counter()
+        return data
+
+    def merge(self, data):
+        """
+        Merge translations and statistics collected by :meth:`collect`
+        in another process
+
+        :param data: a tuple of dict of new entries, hits and misses
+        """
+        entries, hits, misses = data
+        for key, result in entries.items():
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+        self._trim()
+        self.hits.update(hits)
+        self.misses.update(misses)
+
+    def load(self, cache_path, tag):
+        """
+        Load translations persisted by a previous run
+
+        :param cache_path: path to a cache file
+        :param tag: tag that identifies translator code version; entries saved
+            with a different tag are discarded
+        """
+        try:
+            with cache_path.open('rb') as fo:
+                data = pickle.load(fo)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return
+        if (not isinstance(data, dict) or data.get('version') != CACHE_VERSION
+                or data.get('tag') != tag):
+            return
+        self._entries.update(data['entries'])
+        self._trim()
+
+    def save(self, cache_path, tag):
+        """
+        Persist translations for next runs
+
+        :param cache_path: path to a cache file
+        :param tag: tag that identifies translator code version
+        """
+        with cache_path.open('wb') as fo:
+            pickle.dump({'version': CACHE_VERSION, 'tag': tag, 'entries': self._entries},
+                        fo, pickle.HIGHEST_PROTOCOL)
+
+
+parse_cache = ParseCache()
+translation_cache = TranslationCache()
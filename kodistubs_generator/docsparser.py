@@ -2,42 +2,78 @@
 Parser for Doxygen XML docs for Kodi Python API functions and classes
 """
 import re
-from xml.sax import parseString
+import sqlite3
+from contextlib import closing
+from functools import partial
+from html import escape
 
 import lxml.etree as etree
 
+from .cache import parse_cache
 from .docstrings_parser.parser import DocstringParser
+from .headerparser import comment_to_xml, index_headers
+from .model import ClassDocs, FunctionDocs, ModuleDocs
+from .modules import MODULES, SQLITE3_DB
+from .profiling import count_calls, profiler
 from .swigparser import parse_swig_xml
 
-MODULES = [
-    'group__python__xbmc.xml',
-    'group__python__xbmcaddon.xml',
-    'group__python__xbmcgui.xml',
-    'group__python__xbmcplugin.xml',
-    'group__python__xbmcvfs.xml',
-    'group__python__xbmcdrm.xml',
-]
+# Elements of Doxygen group XML files that are processed by parse_group_xml
+GROUP_TAGS = (
+    'title',
+    'innerclass',
+    'innergroup',
+    'memberdef',
+    'briefdescription',
+    'detaileddescription',
+)
+
+# Queries of a Doxygen SQLite3 database that extract the same info as parse_group_xml
+SQLITE3_GROUP_QUERY = """
+    SELECT compounddef.rowid, compounddef.title,
+           compounddef.briefdescription, compounddef.detaileddescription
+    FROM refid JOIN compounddef ON compounddef.rowid = refid.rowid
+    WHERE refid.refid = ? AND compounddef.kind = 'group'
+"""
+SQLITE3_INNER_QUERY = """
+    SELECT compounddef.kind, compounddef.name, refid.refid
+    FROM contains
+    JOIN compounddef ON compounddef.rowid = contains.inner_rowid
+    JOIN refid ON refid.rowid = contains.inner_rowid
+    WHERE contains.outer_rowid = ?
+    ORDER BY contains.rowid
+"""
+SQLITE3_MEMBERS_QUERY = """
+    SELECT memberdef.name, memberdef.briefdescription, memberdef.detaileddescription
+    FROM member JOIN memberdef ON memberdef.rowid = member.memberdef_rowid
+    WHERE member.scope_rowid = ? AND memberdef.kind = 'function' AND memberdef.prot != 2
+    ORDER BY member.rowid
+"""
 
+# Docstring rewrites applied in order. Each rewrite has substrings that its
+# regex cannot match without, so the regex runs only if one of them is present
+# in the docstring after the previous rewrites.
 CLEAN_DOCS_SUBS = [
-    (re.compile(r'\*\*Example:\*\*'), 'Example::'),
-    (re.compile(r'\.Example::'), '.\n\nExample::'),
-    (re.compile(r'(\n:(?:param|return|raises).+?)\n(\w)'), '\\1\n\n\\2'),
-    (re.compile(r'^\s\sAdded'), 'Added'),
-    (re.compile(r'([\w,])(\*\*[^*]+?\*\*)'), r'\1 \2'),
-    (re.compile(r'``\*\*|\*\*``'), '``'),
-    (re.compile(r'\*\*"|"\*\*'), '``'),
-    (re.compile(r'^{\s.+?\s}$', re.M), ''),
-    (re.compile(r'(\w)(`?`\w+?`?)'), r'\1 \2'),
-    (re.compile(r'(.)\n\n\n+?(.)'), '\\1\n\n\\2'),
+    (re.compile(r'\*\*Example:\*\*'), 'Example::', ('**Example:**',)),
+    (re.compile(r'\.Example::'), '.\n\nExample::', ('.Example::',)),
+    (re.compile(r'(\n:(?:param|return|raises).+?)\n(\w)'), '\\1\n\n\\2', ('\n:',)),
+    (re.compile(r'^\s\sAdded'), 'Added', ('Added',)),
+    (re.compile(r'([\w,])(\*\*[^*]+?\*\*)'), r'\1 \2', ('**',)),
+    (re.compile(r'``\*\*|\*\*``'), '``', ('``**', '**``')),
+    (re.compile(r'\*\*"|"\*\*'), '``', ('**"', '"**')),
+    (re.compile(r'^{\s.+?\s}$', re.M), '', ('{',)),
+    (re.compile(r'(\w)(`?`\w+?`?)'), r'\1 \2', ('`',)),
+    (re.compile(r'(.)\n\n\n+?(.)'), '\\1\n\n\\2', ('\n\n\n',)),
 ]
 
 
 def clean_docstring(docs):
-    for sub in CLEAN_DOCS_SUBS:
-        docs = sub[0].sub(sub[1], docs)
+    for regexp, repl, triggers in CLEAN_DOCS_SUBS:
+        if any(trigger in docs for trigger in triggers):
+            docs = regexp.sub(repl, docs)
     return docs
 
 
+@count_calls
 def parse_description(description_tag):
     """
     Parse an etree node with function/class description
@@ -46,10 +82,11 @@ def parse_description(description_tag):
     :return: function/class description as a string
     """
     handler = DocstringParser()
-    parseString(etree.tostring(description_tag).decode('utf-8').replace('\n', ''), handler)
+    handler.parse_element(description_tag)
     return str(handler)
 
 
+@count_calls
 def parse_function_docs(memberdef_tag):
     """
     Parse an etree node with function docs
@@ -64,44 +101,220 @@ def parse_function_docs(memberdef_tag):
     return clean_docstring(docstring).strip(' \n')
 
 
-def parse_xml_docs(xml_docs, docs_dir):
+def _release_element(elem):
+    """
+    Free memory used by a processed element and its preceding siblings
+
+    :param elem: etree node received from :func:`etree.iterparse`
+    """
+    elem.clear()
+    while elem.getprevious() is not None:
+        del elem.getparent()[0]
+
+
+def parse_group_xml(xml_docs):
     """
-    Parse and XML Doxygen docs file
+    Parse a single XML Doxygen docs file without its innergroups
+
+    The file is parsed incrementally and processed elements are released
+    as soon as possible, so memory usage does not depend on the file size.
 
     :param xml_docs: path to a XML docs file
-    :param docs_dir: directory where Doxygen docs are located
-    :return: docs dict object with module info extracted from an XML docs file
+    :return: dict with group name, docstring, list of :class:`FunctionDocs`
+        and innergroup refids
     """
-    root_tag = etree.parse(xml_docs)
-    compounddef_tag = root_tag.find('compounddef')
-    innerclass_tag = compounddef_tag.find('innerclass')
-    if innerclass_tag is not None:
-        name = innerclass_tag.text.split('::')[-1]
+    title = innerclass = None
+    briefdescription = detaileddescription = ''
+    members = []
+    innergroups = []
+    for _, elem in etree.iterparse(str(xml_docs), tag=GROUP_TAGS):
+        parent_tag = elem.getparent()
+        if elem.tag == 'memberdef':
+            if (parent_tag.tag == 'sectiondef' and parent_tag.get('kind') == 'func'
+                    and elem.attrib['prot'] != 'private'):
+                members.append((elem.find('name').text, parse_function_docs(elem)))
+            _release_element(elem)
+            continue
+        if parent_tag is None or parent_tag.tag != 'compounddef':
+            continue
+        if elem.tag == 'title' and title is None:
+            title = elem.text
+        elif elem.tag == 'innerclass' and innerclass is None:
+            innerclass = elem.text
+        elif elem.tag == 'innergroup':
+            innergroups.append(elem.attrib['refid'])
+        elif elem.tag == 'briefdescription':
+            briefdescription = parse_description(elem)
+        elif elem.tag == 'detaileddescription':
+            detaileddescription = parse_description(elem)
+        _release_element(elem)
+    return _make_group_docs(title, innerclass, briefdescription + detaileddescription,
+                            members, innergroups)
+
+
+def _make_group_docs(title, innerclass, docstring, members, innergroups):
+    """
+    Create a dict with group info from its parsed parts
+
+    :param title: group title
+    :param innerclass: qualified name of the first class in the group or ``None``
+    :param docstring: group description
+    :param members: list of tuples of function names and docstrings
+    :param innergroups: list of innergroup refids
+    :return: dict with group name, docstring, list of :class:`FunctionDocs`
+        and innergroup refids
+    """
+    if innerclass is not None:
+        name = innerclass.split('::')[-1]
     else:
-        name = compounddef_tag.find('title').text
-    briefdescription_tag = compounddef_tag.find('briefdescription')
-    docstring = parse_description(briefdescription_tag)
-    detaileddescription_tag = compounddef_tag.find('detaileddescription')
-    docstring += parse_description(detaileddescription_tag)
-    docstring = clean_docstring(docstring).rstrip('\n')
+        name = title
     functions = []
-    for memberdef in compounddef_tag.xpath('.//sectiondef[@kind="func"]/memberdef'):
-        func_name = memberdef.find('name').text
-        if memberdef.attrib['prot'] == 'private' or name == func_name:
+    for func_name, func_docstring in members:
+        if name == func_name:
             continue
         if func_name == 'deleteFile':
             func_name = 'delete'
-        functions.append({
-            'name': func_name,
-            'docstring': parse_function_docs(memberdef)
-        })
+        functions.append(FunctionDocs(func_name, func_docstring))
+    return {
+        'name': name,
+        'docstring': clean_docstring(docstring).rstrip('\n'),
+        'functions': functions,
+        'innergroups': innergroups,
+    }
+
+
+def _make_description(tag, description):
+    """
+    Convert the contents of a Doxygen XML description element to an etree node
+
+    Doxygen SQLite3 databases store descriptions in this form.
+
+    :param tag: description tag, e.g. ``briefdescription``
+    :param description: description XML or ``None``
+    :return: etree node with the description
+    """
+    return etree.fromstring(f'<{tag}>{description or ""}</{tag}>')
+
+
+def read_sqlite3_group(connection, refid):
+    """
+    Read a single Doxygen group without its innergroups from a SQLite3 database
+
+    :param connection: :class:`sqlite3.Connection` to a Doxygen SQLite3 database
+    :param refid: Doxygen group refid
+    :return: dict with group name, docstring, list of :class:`FunctionDocs`
+        and innergroup refids, see :func:`parse_group_xml`
+    :raises ValueError: if the group is not found
+    """
+    row = connection.execute(SQLITE3_GROUP_QUERY, (refid,)).fetchone()
+    if row is None:
+        raise ValueError(f'Doxygen group {refid} is not found in the database')
+    rowid, title, briefdescription, detaileddescription = row
+    innerclass = None
+    innergroups = []
+    for kind, name, inner_refid in connection.execute(SQLITE3_INNER_QUERY, (rowid,)):
+        if kind == 'group':
+            innergroups.append(inner_refid)
+        elif kind in ('class', 'struct') and innerclass is None:
+            innerclass = name
+    members = []
+    for func_name, func_brief, func_detailed in connection.execute(SQLITE3_MEMBERS_QUERY,
+                                                                   (rowid,)):
+        memberdef_tag = etree.Element('memberdef')
+        memberdef_tag.append(_make_description('briefdescription', func_brief))
+        memberdef_tag.append(_make_description('detaileddescription',
+                                               func_detailed))
+        members.append((func_name, parse_function_docs(memberdef_tag)))
+    docstring = (parse_description(_make_description('briefdescription', briefdescription))
+                 + parse_description(_make_description('detaileddescription',
+                                                       detaileddescription)))
+    return _make_group_docs(title, innerclass, docstring, members, innergroups)
+
+
+def _comment_descriptions(lines):
+    """
+    Convert lines of a header comment to etree nodes of brief and detailed descriptions
+
+    If the comment markup cannot be converted to valid XML,
+    the whole comment is used as plain text of the detailed description.
+
+    :param lines: comment lines
+    :return: a tuple of brief and detailed description etree nodes
+    """
+    brief, detailed = comment_to_xml(lines)
+    try:
+        return (_make_description('briefdescription', brief),
+                _make_description('detaileddescription', detailed))
+    except etree.XMLSyntaxError:
+        text = escape(' '.join(lines), quote=False)
+        return (_make_description('briefdescription', None),
+                _make_description('detaileddescription', f'<para>{text}</para>'))
+
+
+def read_header_group(header_index, refid):
+    """
+    Read a single Doxygen group without its innergroups from an index of headers
+
+    :param header_index: dict of groups returned by
+        :func:`kodistubs_generator.headerparser.index_headers`
+    :param refid: Doxygen group refid
+    :return: dict with group name, docstring, list of :class:`FunctionDocs`
+        and innergroup refids, see :func:`parse_group_xml`
+    :raises ValueError: if the group is not defined in headers
+    """
+    group = header_index.get(refid)
+    if group is None or group['title'] is None:
+        raise ValueError(f'Doxygen group {refid} is not defined in headers')
+    members = []
+    for func_name, func_lines in group['members']:
+        memberdef_tag = etree.Element('memberdef')
+        memberdef_tag.extend(_comment_descriptions(func_lines))
+        members.append((func_name, parse_function_docs(memberdef_tag)))
+    docstring = ''.join(parse_description(description)
+                        for description in _comment_descriptions(group['lines']))
+    return _make_group_docs(group['title'], group['innerclass'], docstring, members,
+                            group['innergroups'])
+
+
+def load_xml_group(docs_dir, refid):
+    """
+    Load a single Doxygen group without its innergroups from its XML file
+
+    :param docs_dir: directory where Doxygen docs are located
+    :param refid: Doxygen group refid
+    :return: dict with group info, see :func:`parse_group_xml`
+    """
+    return parse_cache.get('group', docs_dir / 'xml' / (refid + '.xml'), parse_group_xml)
+
+
+def load_sqlite3_group(db_path, connection, refid):
+    """
+    Load a single Doxygen group without its innergroups from a SQLite3 database
+
+    :param db_path: path to a Doxygen SQLite3 database
+    :param connection: :class:`sqlite3.Connection` to the database
+    :param refid: Doxygen group refid
+    :return: dict with group info, see :func:`parse_group_xml`
+    """
+    return parse_cache.get('sqlite3 ' + refid, db_path,
+                           lambda _: read_sqlite3_group(connection, refid))
+
+
+def parse_group_docs(refid, load_group):
+    """
+    Parse Doxygen docs of a group and its innergroups
+
+    :param refid: Doxygen group refid
+    :param load_group: function that takes a group refid and returns
+        a dict with group info, see :func:`parse_group_xml`
+    :return: :class:`ClassDocs` object with group info
+    """
+    group_docs = load_group(refid)
+    name = group_docs['name']
+    functions = group_docs['functions']
     classes = []
-    for innergroup_tag in compounddef_tag.findall('innergroup'):
-        class_xml_name = innergroup_tag.attrib['refid']
-        innergroup_xml_docs = parse_xml_docs(
-            docs_dir / 'xml' / (class_xml_name + '.xml'),
-            docs_dir
-        )
+    for class_xml_name in group_docs['innergroups']:
+        innergroup_xml_docs = parse_group_docs(class_xml_name, load_group)
         if (name in (
                 'Player',
                 'Window'
@@ -111,55 +324,122 @@ def parse_xml_docs(xml_docs, docs_dir):
                         'group__python__xbmcgui__window__cb'
                     )
                 ):
-            functions += innergroup_xml_docs['functions']
+            functions += innergroup_xml_docs.functions
         else:
             classes.append(innergroup_xml_docs)
-    return {
-        'name': name,
-        'docstring': docstring,
-        'classes': classes,
-        'functions': functions
-    }
+    return ClassDocs(name, group_docs['docstring'], classes, functions)
 
 
 def flatten_classes(docs):
     """
-    Flatten classes hierarchy in docs dictionary
+    Flatten classes hierarchy in docs object
 
-    :param docs: docs dict object
-    :return: docs dict with flattened classes
+    :param docs: :class:`ModuleDocs` or :class:`ClassDocs` object
+    :return: generator of classes with their nested classes moved out
     """
-    for class_ in docs['classes']:
+    for class_ in docs.classes:
         yield class_
-        if class_['classes']:
+        if class_.classes:
             for child_class in flatten_classes(class_):
                 yield child_class
-        del class_['classes']
+        class_.classes = []
 
 
-def parse(docs_dir, swig_dir):
+def flatten_module_docs(module_docs):
     """
-    High-level parser function
+    Arrange module docs into a flat list of module classes
 
-    :param docs_dir: directory where Doxygen docs are located
+    :param module_docs: :class:`ModuleDocs` object
+    """
+    # Addon and CryptoSession modules are documented as classes
+    if module_docs.name == 'Addon':
+        module_docs.classes.insert(0, ClassDocs(module_docs.name, module_docs.docstring,
+                                                functions=module_docs.functions))
+        module_docs.functions = []
+    elif module_docs.name == 'CryptoSession':
+        module_docs.classes = [ClassDocs(module_docs.name, module_docs.docstring,
+                                         module_docs.classes, module_docs.functions)]
+        module_docs.functions = []
+    else:
+        module_docs.classes = list(flatten_classes(module_docs))
+
+
+def parse_module_docs(module, docs_dir, backend='xml'):
+    """
+    Parse Doxygen docs for a single Kodi Python API module
+
+    With ``'headers'`` backend docs are read directly from Kodi headers
+    without Doxygen.
+
+    :param module: module group XML file name from :data:`MODULES`
+    :param docs_dir: directory where Doxygen docs are located, or the directory
+        with Kodi Python API sources for ``'headers'`` backend
+    :param backend: docs source, ``'xml'``, ``'sqlite3'`` or ``'headers'``
+    :return: :class:`ModuleDocs` object
+    """
+    refid = module[:-len('.xml')]
+    if backend == 'headers':
+        group_docs = parse_group_docs(refid, partial(read_header_group, index_headers(docs_dir)))
+    elif backend == 'sqlite3':
+        db_path = docs_dir / SQLITE3_DB
+        db_uri = db_path.resolve().as_uri() + '?mode=ro'
+        with closing(sqlite3.connect(db_uri, uri=True)) as connection:
+            group_docs = parse_group_docs(refid,
+                                          partial(load_sqlite3_group, db_path, connection))
+    else:
+        group_docs = parse_group_docs(refid, partial(load_xml_group, docs_dir))
+    return ModuleDocs(group_docs.name, group_docs.docstring, group_docs.classes,
+                      group_docs.functions)
+
+
+def parse_module(module, docs_dir, swig_dir, backend='xml'):
+    """
+    Parse docs and SWIG definitions for a single Kodi Python API module
+
+    :param module: module group XML file name from :data:`MODULES`
+    :param docs_dir: directory where Doxygen docs are located, or the directory
+        with Kodi Python API sources for ``'headers'`` backend
     :param swig_dir: directory where SWIG XML definitions are located
-    :return: docs dictionary containing all necessary info for generating
-        a Python stub and a Sphinx automodule definition
-    """
-    docs = []
-    for module in MODULES:
-        module_xml = docs_dir / 'xml' / module
-        module_docs = parse_xml_docs(module_xml, docs_dir)
-        if module_docs['name'] == 'Addon':
-            module_docs_copy = module_docs.copy()
-            module_docs_copy['classes'] = []
-            module_docs['classes'].insert(0, module_docs_copy)
-            module_docs['functions'] = []
-        elif module_docs['name'] == 'CryptoSession':
-            module_docs['classes'] = [module_docs.copy()]
-            module_docs['functions'] = []
-        else:
-            module_docs['classes'] = list(flatten_classes(module_docs))
+    :param backend: docs source, ``'xml'``, ``'sqlite3'`` or ``'headers'``
+    :return: :class:`ModuleDocs` object containing all necessary info
+        for generating a Python stub for the module
+    """
+    with profiler.stage('parse_xml_docs', module):
+        module_docs = parse_module_docs(module, docs_dir, backend)
+        flatten_module_docs(module_docs)
+    with profiler.stage('parse_swig_xml', module):
         parse_swig_xml(module_docs, swig_dir)
-        docs.append(module_docs)
-    return docs
+    return module_docs
+
+
+def iter_parse(docs_dir, swig_dir, modules=MODULES, backend='xml'):
+    """
+    Parse Kodi Python API modules one by one
+
+    Each module is yielded as soon as its SWIG definitions are matched,
+    so it can be rendered, written and released before the next module
+    is parsed. The generator keeps no references to yielded modules.
+
+    :param docs_dir: directory where Doxygen docs are located, or the directory
+        with Kodi Python API sources for ``'headers'`` backend
+    :param swig_dir: directory where SWIG XML definitions are located
+    :param modules: module group XML file names
+    :param backend: docs source, ``'xml'``, ``'sqlite3'`` or ``'headers'``
+    :return: generator of :class:`ModuleDocs` objects in the order of ``modules``
+    """
+    for module in modules:
+        yield parse_module(module, docs_dir, swig_dir, backend)
+
+
+def parse(docs_dir, swig_dir, backend='xml'):
+    """
+    High-level parser function
+
+    :param docs_dir: directory where Doxygen docs are located, or the directory
+        with Kodi Python API sources for ``'headers'`` backend
+    :param swig_dir: directory where SWIG XML definitions are located
+    :param backend: docs source, ``'xml'``, ``'sqlite3'`` or ``'headers'``
+    :return: list of :class:`ModuleDocs` objects containing all necessary info
+        for generating a Python stub and a Sphinx automodule definition
+    """
+    return list(iter_parse(docs_dir, swig_dir, backend=backend))
@@ -7,6 +7,7 @@ LINE_LENGTH = 90
 
 
 class BaseElement(ABC):
+    __slots__ = ()
 
     @abstractmethod
     def append(self, content: str):
@@ -24,25 +25,35 @@ class BaseElement(ABC):
 
 
 class BaseTextElement(BaseElement):
+    """
+    Text is accumulated as a list of chunks that are joined only once
+    when the element is rendered
+    """
+    __slots__ = ('_chunks',)
+
     STRIP_REGEXPS = [
         re.compile(r'^({[^}]+}])'),
         re.compile(r'^(\\python_[^{]+{[^}]+})'),
     ]
 
     def __init__(self):
-        self._string: str = ''
+        self._chunks: List[str] = []
 
     def append(self, content: str):
-        self._string += content
+        self._chunks.append(content)
 
     def as_string(self) -> str:
-        string = self._string.strip()
+        string = ''.join(self._chunks).strip()
+        # Both regexps are anchored to the start of the string
+        if not string.startswith(('{', '\\')):
+            return string
         for regexp in self.STRIP_REGEXPS:
             string = regexp.sub('', string).strip()
         return string
 
 
 class TextElement(BaseTextElement):
+    __slots__ = ()
 
     def as_string(self) -> str:
         string = super().as_string()
@@ -52,6 +63,7 @@ class TextElement(BaseTextElement):
 
 
 class HeadingElement(BaseTextElement):
+    __slots__ = ()
 
     def as_string(self) -> str:
         string = super().as_string()
@@ -61,6 +73,7 @@ class HeadingElement(BaseTextElement):
 
 
 class ParaElement(BaseTextElement):
+    __slots__ = ()
 
     def as_string(self) -> str:
         string = super().as_string()
@@ -70,6 +83,7 @@ class ParaElement(BaseTextElement):
 
 
 class ParameternameElement(BaseTextElement):
+    __slots__ = ('_prefix',)
 
     def __init__(self, is_exception: bool = False):
         super().__init__()
@@ -81,6 +95,7 @@ class ParameternameElement(BaseTextElement):
 
 
 class ParameterdescriptionElement(BaseTextElement):
+    __slots__ = ()
 
     def as_string(self) -> str:
         string = super().as_string()
@@ -90,22 +105,25 @@ class ParameterdescriptionElement(BaseTextElement):
 
 
 class TableElement(BaseElement):
+    __slots__ = ('_columns', '_rows', '_table', '_column_max_widths', 'has_header')
 
     def __init__(self, columns: int):
         self._columns: int = columns
+        # Text chunks of each cell, joined when the table is rendered
+        self._rows: List[List[List[str]]] = []
         self._table: List[List[str]] = []
         self._column_max_widths: List[int] = []
         self.has_header = False
 
     def start_row(self):
-        self._table.append([])
+        self._rows.append([])
 
     def start_cell(self):
-        self._table[-1].append('')
+        self._rows[-1].append([])
 
     def append(self, content: str):
-        if self._table and self._table[-1]:
-            self._table[-1][-1] += content
+        if self._rows and self._rows[-1]:
+            self._rows[-1][-1].append(content)
 
     def __iter__(self) -> Iterator[str]:
         for row in self._table:
@@ -118,6 +136,7 @@ class TableElement(BaseElement):
             yield row[column]
 
     def _normalize_table(self):
+        self._table = [[''.join(cell) for cell in row] for row in self._rows]
         for row in self._table:
             diff = self._columns - len(row)
             row += [''] * diff
@@ -154,6 +173,7 @@ class TableElement(BaseElement):
 
 
 class CodelineElement(BaseTextElement):
+    __slots__ = ()
 
     def as_string(self) -> str:
         string = super().as_string()
@@ -163,6 +183,7 @@ class CodelineElement(BaseTextElement):
 
 
 class SimplesectReturnElement(BaseTextElement):
+    __slots__ = ()
 
     def as_string(self) -> str:
         string = super().as_string()
@@ -170,6 +191,7 @@ class SimplesectReturnElement(BaseTextElement):
 
 
 class NoteElement(BaseTextElement):
+    __slots__ = ()
 
     def as_string(self) -> str:
         string = super().as_string()
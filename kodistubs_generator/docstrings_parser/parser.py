@@ -3,11 +3,16 @@
 Parse doxygen object descriptions into ReStructuredText docstrings
 """
 
+import re
 from typing import List
 from xml.sax.handler import ContentHandler
 
 from . import elements
 
+# Text runs as reported by expat for an lxml tree serialized to ASCII:
+# markup characters and non-ASCII characters become separate chunks
+TEXT_CHUNK_RE = re.compile('[^&<>\r\x80-\U0010ffff]+|.', re.S)
+
 
 class DocstringParser(ContentHandler):
 
@@ -17,11 +22,34 @@ class DocstringParser(ContentHandler):
         self._reading_exception_block = False
 
     def as_string(self):
-        return ''.join(str(elem) for elem in self._elements)
+        return ''.join([elem.as_string() for elem in self._elements])
 
     def __str__(self):
         return self.as_string()
 
+    def parse_element(self, element):
+        """
+        Generate parser events directly from an lxml element tree
+
+        Newlines are removed and text is split into chunks the same way
+        as if the element was serialized and parsed with :mod:`xml.sax`.
+
+        :param element: lxml element
+        """
+        self.startElement(element.tag, element.attrib)
+        self._feed_text(element.text)
+        for child in element:
+            # Skip comments and processing instructions
+            if isinstance(child.tag, str):
+                self.parse_element(child)
+            self._feed_text(child.tail)
+        self.endElement(element.tag)
+
+    def _feed_text(self, text: str):
+        if text:
+            for chunk in TEXT_CHUNK_RE.findall(text.replace('\n', '')):
+                self.characters(chunk)
+
     def startElement(self, name: str, attrs: dict):
         if name == 'parameterlist' and attrs.get('kind') == 'exception':
             self._reading_exception_block = True
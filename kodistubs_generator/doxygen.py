@@ -0,0 +1,245 @@
+"""
+Helpers for deciding when and over which Kodi sources Doxygen has to be run
+and for merging outputs of sharded Doxygen runs
+"""
+import json
+import re
+import shutil
+from copy import deepcopy
+
+import lxml.etree as etree
+
+from .manifest import hash_file
+from .modules import MODULES
+
+GROUP_COMMAND_RE = re.compile(r'[\\@](defgroup|ingroup|addtogroup)[ \t]+(\w+)')
+
+# C and C++ file extensions that Doxygen reads by default when FILE_PATTERNS is empty
+DOXYGEN_FILE_SUFFIXES = frozenset((
+    '.c', '.cc', '.cxx', '.cpp', '.c++', '.ii', '.ixx', '.ipp', '.i++', '.inl',
+    '.h', '.hh', '.hxx', '.hpp', '.h++', '.idl',
+))
+
+# Elements of Doxygen XML files whose children are merged by their keys
+MERGED_CONTAINERS = frozenset((
+    'doxygen', 'compounddef', 'sectiondef', 'listofallmembers', 'doxygenindex', 'compound',
+))
+
+
+def module_group_id(module):
+    """
+    Convert a module group XML file name to a Doxygen group id
+
+    :param module: module group XML file name, e.g. ``group__python__xbmc.xml``
+    :return: Doxygen group id, e.g. ``python_xbmc``
+    """
+    return module[len('group__'):-len('.xml')].replace('__', '_')
+
+
+def hash_sources(src_dir):
+    """
+    Calculate hashes of Kodi Python API source files
+
+    :param src_dir: directory with Kodi Python API sources
+    :return: dict of file names and their hashes
+    """
+    return {path.name: hash_file(path)
+            for path in sorted(src_dir.iterdir()) if path.is_file()}
+
+
+def _scan_groups(path):
+    """
+    Find Doxygen groups that are defined and referenced in a source file
+
+    :param path: path to a source file
+    :return: a tuple of sets of defined and referenced group ids
+    """
+    defined = set()
+    referenced = set()
+    for command, group in GROUP_COMMAND_RE.findall(
+            path.read_text(encoding='utf-8', errors='replace')):
+        if command == 'defgroup':
+            defined.add(group)
+        else:
+            referenced.add(group)
+    return defined, referenced
+
+
+def collect_module_headers(src_dir, modules=MODULES):
+    """
+    Collect headers that define or contribute to Doxygen groups
+    of Kodi Python API modules and all their nested groups
+
+    :param src_dir: directory with Kodi Python API sources
+    :param modules: list of module group XML file names
+    :return: sorted list of header paths
+    """
+    headers = {}
+    for path in sorted(src_dir.glob('*.h')):
+        defined, referenced = _scan_groups(path)
+        if defined or referenced:
+            headers[path] = (defined, referenced)
+    scope = {module_group_id(module) for module in modules}
+    selected = set()
+    changed = True
+    while changed:
+        changed = False
+        for path, (defined, referenced) in headers.items():
+            if path not in selected and (defined | referenced) & scope:
+                selected.add(path)
+                scope |= defined
+                changed = True
+    return sorted(selected)
+
+
+def collect_doxygen_inputs(src_dir):
+    """
+    Collect source files that Doxygen reads from a directory
+
+    :param src_dir: directory with Kodi Python API sources
+    :return: sorted list of source file paths
+    """
+    return sorted(path for path in src_dir.iterdir()
+                  if path.is_file() and path.suffix.lower() in DOXYGEN_FILE_SUFFIXES)
+
+
+def shard_inputs(input_files, shards):
+    """
+    Split Doxygen input files into shards for parallel Doxygen runs
+
+    Sorted files are split into contiguous chunks of similar total size.
+    Doxygen ignores ``\\ingroup`` commands for groups that are not defined
+    in its inputs, so each shard also includes files that define groups
+    referenced by its files. Symbols of such files appear in outputs
+    of several shards and are de-duplicated by :func:`merge_doxy_xml`.
+
+    :param input_files: list of source file paths
+    :param shards: maximum number of shards
+    :return: list of sorted lists of source file paths
+    """
+    input_files = sorted(input_files)
+    groups = {path: _scan_groups(path) for path in input_files}
+    definers = {}
+    for path, (defined, _) in groups.items():
+        for group in defined:
+            definers.setdefault(group, set()).add(path)
+    sizes = [path.stat().st_size for path in input_files]
+    target = sum(sizes) / max(1, min(shards, len(input_files)))
+    chunks = []
+    total = 0
+    for path, size in zip(input_files, sizes):
+        if not chunks or total >= target * len(chunks) and len(chunks) < shards:
+            chunks.append(set())
+        chunks[-1].add(path)
+        total += size
+    for chunk in chunks:
+        pending = list(chunk)
+        while pending:
+            defined, referenced = groups[pending.pop()]
+            for group in defined | referenced:
+                for path in definers.get(group, ()):
+                    if path not in chunk:
+                        chunk.add(path)
+                        pending.append(path)
+    return [sorted(chunk) for chunk in chunks]
+
+
+def _element_key(elem):
+    """
+    Get a key that identifies an element of a Doxygen XML file among its siblings
+
+    :param elem: etree node
+    :return: a tuple of the element tag and its id, refid or section kind
+    """
+    if elem.tag == 'sectiondef':
+        return elem.tag, elem.get('kind'), elem.findtext('header')
+    return elem.tag, elem.get('id') or elem.get('refid')
+
+
+def _merge_element(base, other):
+    """
+    Merge children of the same element from two Doxygen XML files
+
+    Children that are missing from ``base`` are inserted before the next
+    child that is present in both nodes or at the end. Shards contain
+    contiguous chunks of sorted inputs, so this keeps the order of inputs.
+    Children of containers, e.g. members of sections, are merged recursively,
+    and empty elements, e.g. descriptions, are replaced with non-empty ones.
+
+    :param base: etree node to merge into
+    :param other: etree node of the same element from another file
+    """
+    existing = {}
+    for child in base:
+        existing.setdefault(_element_key(child), child)
+    # New children are inserted before the next child present in both nodes
+    pending = []
+    for child in other:
+        key = _element_key(child)
+        base_child = existing.get(key)
+        if base_child is None:
+            new_child = existing[key] = deepcopy(child)
+            pending.append(new_child)
+            continue
+        for new_child in pending:
+            base_child.addprevious(new_child)
+        pending = []
+        if child.tag in MERGED_CONTAINERS:
+            _merge_element(base_child, child)
+        elif (len(base_child) == 0 and not (base_child.text or '').strip()
+                and (len(child) or (child.text or '').strip())):
+            existing[key] = deepcopy(child)
+            base.replace(base_child, existing[key])
+    base.extend(pending)
+
+
+def merge_doxy_xml(shard_dirs, xml_dir):
+    """
+    Merge XML outputs of sharded Doxygen runs into a single XML directory
+
+    Files that are written by one shard are moved as is. Compound files
+    and the index written by several shards are merged, so that compounds,
+    e.g. groups, get members and inner compounds from all shards.
+
+    :param shard_dirs: XML output directories of shards in the order of inputs
+    :param xml_dir: merged XML output directory
+    """
+    outputs = {}
+    for shard_dir in shard_dirs:
+        for path in sorted(shard_dir.iterdir()):
+            outputs.setdefault(path.name, []).append(path)
+    xml_dir.mkdir(parents=True, exist_ok=True)
+    for name, paths in outputs.items():
+        if len(paths) == 1 or not name.endswith('.xml'):
+            shutil.move(str(paths[0]), str(xml_dir / name))
+            continue
+        tree = etree.parse(str(paths[0]))
+        if tree.getroot().tag in MERGED_CONTAINERS:
+            for path in paths[1:]:
+                _merge_element(tree.getroot(), etree.parse(str(path)).getroot())
+        tree.write(str(xml_dir / name), encoding='UTF-8', xml_declaration=True)
+
+
+def load_doxy_state(state_path):
+    """
+    Load the state of the previous Doxygen run
+
+    :param state_path: path to a Doxygen state file
+    :return: state dict or None if the file does not exist or is invalid
+    """
+    try:
+        with state_path.open('r', encoding='utf-8') as fo:
+            return json.load(fo)
+    except (OSError, ValueError):
+        return None
+
+
+def save_doxy_state(state_path, state):
+    """
+    Save the state of a Doxygen run
+
+    :param state_path: path to a Doxygen state file
+    :param state: state dict
+    """
+    with state_path.open('w', encoding='utf-8') as fo:
+        json.dump(state, fo, indent=2, sort_keys=True)
@@ -0,0 +1,485 @@
+"""
+Parser for Doxygen comments in Kodi Python API headers
+
+Documentation groups and documented functions are extracted directly
+from ``xbmc/interfaces/legacy/*.h`` and their comments are converted
+to the same XML markup as Doxygen writes, so that module docs can be
+generated without running Doxygen. Only ``///`` comments and the subset
+of Doxygen commands and Markdown used in Kodi headers are supported.
+"""
+import re
+from html import escape
+
+from .cache import parse_cache
+
+# Macros that are defined by PREDEFINED option in kodi.doxy.tpl
+PREDEFINED_MACROS = frozenset(('DOXYGEN_SHOULD_SKIP_THIS', 'DOXYGEN_SHOULD_USE_THIS'))
+
+DIRECTIVE_RE = re.compile(r'#\s*(\w+)\s*(.*)')
+DEFGROUP_RE = re.compile(r'[\\@]defgroup\s+(\w+)\s*(.*)')
+INGROUP_RE = re.compile(r'[\\@](?:ingroup|addtogroup)\s+(\w+)')
+GROUP_OPEN_RE = re.compile(r'(?:/\*\*|//+)?\s*[\\@]\{\s*(?:\*/)?')
+GROUP_CLOSE_RE = re.compile(r'(?:/\*\*|//+)?\s*[\\@]\}\s*(?:\*/)?')
+CLASS_RE = re.compile(r'(?:class|struct)\s+(\w+)\s*(?::[^;]*)?$')
+FUNCTION_NAME_RE = re.compile(r'(~?\w+)\s*\(')
+ACCESS_RE = re.compile(r'(public|protected|private)\s*:')
+FENCE_RE = re.compile(r'(~~~+|```+)')
+HRULER_RE = re.compile(r'-{3,}')
+HEADING_RE = re.compile(r'(#{1,6})\s+(.*?)\s*#*')
+LIST_ITEM_RE = re.compile(r'[-*+]\s+(.*)')
+TABLE_SEPARATOR_RE = re.compile(r'\|?(\s*:?-+:?\s*\|)+\s*:?-*:?\s*')
+SECTION_RE = re.compile(
+    r'[\\@](param|tparam|return|returns|result|note|throws|throw|exception)'
+    r'(?:\[[\w,\s]*\])?(?:\s+|$)(.*)')
+BRIEF_RE = re.compile(r'[\\@]brief\s*')
+
+# Inline markup applied to escaped text in order
+INLINE_SUBS = [
+    (re.compile(r'`([^`]+)`'), r'<computeroutput>\1</computeroutput>'),
+    (re.compile(r'\*\*(.+?)\*\*'), r'<bold>\1</bold>'),
+    (re.compile(r'&lt;(?:b|strong)&gt;(.*?)&lt;/(?:b|strong)&gt;'), r'<bold>\1</bold>'),
+    (re.compile(r'&lt;(?:em|i)&gt;(.*?)&lt;/(?:em|i)&gt;'), r'<emphasis>\1</emphasis>'),
+    (re.compile(r'&lt;(?:code|tt)&gt;(.*?)&lt;/(?:code|tt)&gt;'),
+     r'<computeroutput>\1</computeroutput>'),
+    (re.compile(r'&lt;br\s*/?&gt;'), '<linebreak/>'),
+    # % prevents Doxygen from linking the following word
+    (re.compile(r'(?<!\w)%(\w)'), r'\1'),
+    (re.compile(r'[\\@]ref\s+[\w.:]+\s+"([^"]*)"'), r'<ref kindref="member">\1</ref>'),
+    (re.compile(r'[\\@]ref\s+([\w.:]+)'), r'<ref kindref="member">\1</ref>'),
+    (re.compile(r'[\\@][pc]\s+([\w.:]+)'), r'<computeroutput>\1</computeroutput>'),
+    (re.compile(r'[\\@]b\s+([\w.:]+)'), r'<bold>\1</bold>'),
+    (re.compile(r'[\\@](?:a|e|em)\s+([\w.:]+)'), r'<emphasis>\1</emphasis>'),
+]
+
+
+def group_refid(group_id):
+    """
+    Convert a Doxygen group id to a group refid
+
+    :param group_id: Doxygen group id, e.g. ``python_xbmc``
+    :return: group refid, e.g. ``group__python__xbmc``
+    """
+    return 'group__' + group_id.replace('_', '__')
+
+
+def iter_active_lines(text):
+    """
+    Iterate over lines of a header that are not excluded by preprocessor
+    conditionals as they are evaluated by Doxygen
+
+    Only macros from :data:`PREDEFINED_MACROS` are considered to be defined.
+    ``#if`` expressions other than ``0`` are considered true.
+
+    :param text: header contents
+    :return: generator of lines without preprocessor directives
+    """
+    # Stack of (branch is active, some branch was taken) of open conditionals
+    conditionals = []
+    active = True
+    for line in text.splitlines():
+        match = DIRECTIVE_RE.match(line.strip())
+        if match is None:
+            if active:
+                yield line
+            continue
+        directive, argument = match.groups()
+        if directive in ('if', 'ifdef', 'ifndef'):
+            if directive == 'ifdef':
+                taken = argument in PREDEFINED_MACROS
+            elif directive == 'ifndef':
+                taken = argument not in PREDEFINED_MACROS
+            else:
+                taken = argument.strip() != '0'
+            conditionals.append([taken, taken])
+        elif directive in ('elif', 'else') and conditionals:
+            conditional = conditionals[-1]
+            conditional[0] = not conditional[1]
+            conditional[1] = True
+        elif directive == 'endif' and conditionals:
+            conditionals.pop()
+        active = all(conditional[0] for conditional in conditionals)
+
+
+def _new_group():
+    return {
+        'title': None,
+        'innerclass': None,
+        'lines': [],
+        'members': [],
+        'innergroups': [],
+    }
+
+
+def _add_block(index, block, code_line, open_groups, state):
+    """
+    Add a documentation block to the index of header groups
+
+    :param index: dict of group refids and groups
+    :param block: list of comment lines
+    :param code_line: the first line of code after the block or ``None``
+    :param open_groups: stack of refids of groups opened with ``@{``
+    :param state: dict with the refid of the last defined group
+        and the access of class members
+    """
+    defgroup = None
+    ingroups = []
+    opens = False
+    lines = []
+    for line in block:
+        stripped = line.strip()
+        match = DEFGROUP_RE.match(stripped)
+        if match is not None:
+            defgroup = match.groups()
+            continue
+        matches = INGROUP_RE.findall(stripped)
+        if matches:
+            ingroups += [group_refid(group_id) for group_id in matches]
+            continue
+        if GROUP_OPEN_RE.fullmatch(stripped):
+            opens = True
+            continue
+        if GROUP_CLOSE_RE.fullmatch(stripped):
+            if open_groups:
+                open_groups.pop()
+            continue
+        lines.append(line)
+    if defgroup is not None:
+        refid = group_refid(defgroup[0])
+        group = index.setdefault(refid, _new_group())
+        group['title'] = defgroup[1]
+        group['lines'] += lines
+        parents = ingroups or open_groups[-1:]
+        for parent in parents:
+            parent_group = index.setdefault(parent, _new_group())
+            if refid not in parent_group['innergroups']:
+                parent_group['innergroups'].append(refid)
+        state['group'] = refid
+        if opens:
+            open_groups.append(refid)
+        return
+    if opens and ingroups:
+        # @addtogroup with @{
+        open_groups.append(ingroups[0])
+        return
+    if code_line is None or state['access'] == 'private':
+        return
+    match = FUNCTION_NAME_RE.search(code_line)
+    if match is None:
+        return
+    for refid in ingroups or open_groups[-1:]:
+        index.setdefault(refid, _new_group())['members'].append((match.group(1), lines))
+
+
+def scan_header(header):
+    """
+    Collect documentation groups and documented functions from a header
+
+    :param header: path to a header file
+    :return: dict of group refids and dicts with group title, the name
+        of the first class in the group, comment lines, list of tuples
+        of member names and comment lines and innergroup refids
+    """
+    index = {}
+    open_groups = []
+    state = {'group': None, 'access': 'public'}
+    block = None
+    for line in iter_active_lines(header.read_text(encoding='utf-8', errors='replace')):
+        stripped = line.strip()
+        if stripped.startswith('///'):
+            content = stripped[3:]
+            if block is None:
+                block = []
+            block.append(content[1:] if content.startswith(' ') else content)
+            continue
+        if not stripped:
+            continue
+        if stripped.startswith(('//', '/*')):
+            # A plain comment ends a block, so the block can only document a group
+            if block is not None:
+                _add_block(index, block, None, open_groups, state)
+                block = None
+            if GROUP_CLOSE_RE.fullmatch(stripped):
+                if open_groups:
+                    open_groups.pop()
+            elif GROUP_OPEN_RE.fullmatch(stripped) and state['group'] is not None:
+                open_groups.append(state['group'])
+            continue
+        if stripped.startswith('};'):
+            state['access'] = 'public'
+        match = ACCESS_RE.match(stripped)
+        if match is not None:
+            state['access'] = match.group(1)
+        match = CLASS_RE.match(stripped)
+        if match is not None:
+            state['access'] = 'private' if stripped.startswith('class') else 'public'
+            for refid in open_groups[-1:]:
+                group = index.setdefault(refid, _new_group())
+                if group['innerclass'] is None:
+                    group['innerclass'] = match.group(1)
+        if block is not None:
+            _add_block(index, block, stripped, open_groups, state)
+            block = None
+    if block is not None:
+        _add_block(index, block, None, open_groups, state)
+    return index
+
+
+def index_headers(src_dir):
+    """
+    Collect documentation groups from all Kodi Python API headers
+
+    Groups that are documented in several headers are merged.
+
+    :param src_dir: directory with Kodi Python API sources
+    :return: dict of group refids and group dicts, see :func:`scan_header`
+    """
+    index = {}
+    for path in sorted(src_dir.glob('*.h')):
+        for refid, header_group in parse_cache.get('header', path, scan_header).items():
+            group = index.setdefault(refid, _new_group())
+            if header_group['title'] is not None:
+                group['title'] = header_group['title']
+            if group['innerclass'] is None:
+                group['innerclass'] = header_group['innerclass']
+            group['lines'] += header_group['lines']
+            group['members'] += header_group['members']
+            group['innergroups'] += [inner_refid for inner_refid in header_group['innergroups']
+                                     if inner_refid not in group['innergroups']]
+    return index
+
+
+def _inline(text):
+    """
+    Convert inline Markdown, HTML and Doxygen markup of a comment line to XML
+
+    :param text: comment text
+    :return: XML contents
+    """
+    text = escape(text, quote=False)
+    for regexp, repl in INLINE_SUBS:
+        text = regexp.sub(repl, text)
+    return text
+
+
+def _split_row(line):
+    """
+    Split a Markdown table row into cell texts
+    """
+    cells = line.strip().strip('|').split('|')
+    return [cell.strip() for cell in cells]
+
+
+def _table(rows):
+    """
+    Convert Markdown table rows to XML
+
+    :param rows: list of table lines
+    :return: XML of a Doxygen table
+    """
+    header = len(rows) > 1 and TABLE_SEPARATOR_RE.fullmatch(rows[1].strip()) is not None
+    if header:
+        rows = rows[:1] + rows[2:]
+    cells = [_split_row(row) for row in rows]
+    cols = max(len(row) for row in cells)
+    xml_rows = []
+    for number, row in enumerate(cells):
+        thead = 'yes' if header and number == 0 else 'no'
+        xml_rows.append('<row>' + ''.join(
+            f'<entry thead="{thead}"><para>{_inline(cell)}</para></entry>' for cell in row)
+            + '</row>')
+    return f'<table rows="{len(xml_rows)}" cols="{cols}">' + ''.join(xml_rows) + '</table>'
+
+
+def _code(lines):
+    """
+    Convert lines of a fenced code block to XML
+
+    :param lines: lines of code
+    :return: XML of a Doxygen program listing
+    """
+    codelines = []
+    for line in lines:
+        if not line.strip():
+            codelines.append('<codeline></codeline>')
+            continue
+        code = escape(line, quote=False).replace(' ', '<sp/>')
+        codelines.append(f'<codeline><highlight class="normal">{code}</highlight></codeline>')
+    return '<programlisting>' + '\n'.join(codelines) + '</programlisting>'
+
+
+class CommentConverter:
+    """
+    Converts lines of a Doxygen comment to XML of Doxygen descriptions
+
+    Paragraphs are separated by blank lines. Parameters, return values
+    and notes are added to the current paragraph and continue until
+    the next command or a blank line.
+    """
+    __slots__ = ('_paras', '_parts', '_section', '_list', '_table', '_code', '_fence',
+                 '_code_indent')
+
+    def __init__(self):
+        # Finished top-level elements of the description
+        self._paras = []
+        # Parts of the current paragraph
+        self._parts = []
+        # (kind, name, lines) of the current parameter, return value or note
+        self._section = None
+        # Items of the current list as lists of lines
+        self._list = None
+        self._table = None
+        self._code = None
+        self._fence = None
+        self._code_indent = 0
+
+    def _flush_section(self):
+        if self._section is None:
+            return
+        kind, name, lines = self._section
+        text = _inline(' '.join(lines))
+        if kind in ('param', 'tparam', 'throws', 'throw', 'exception'):
+            list_kind = 'param' if kind in ('param', 'tparam') else 'exception'
+            name = escape(name, quote=False)
+            item = (f'<parameteritem><parameternamelist><parametername>{name}'
+                    f'</parametername></parameternamelist><parameterdescription>'
+                    f'<para>{text}</para></parameterdescription></parameteritem>')
+            opening = f'<parameterlist kind="{list_kind}">'
+            if self._parts and self._parts[-1].startswith(opening):
+                self._parts[-1] = self._parts[-1][:-len('</parameterlist>')] + item \
+                    + '</parameterlist>'
+            else:
+                self._parts.append(opening + item + '</parameterlist>')
+        else:
+            simplesect_kind = 'note' if kind == 'note' else 'return'
+            self._parts.append(f'<simplesect kind="{simplesect_kind}"><para>{text}</para>'
+                               f'</simplesect>')
+        self._section = None
+
+    def _flush_list(self):
+        if self._list is None:
+            return
+        items = ''.join(f'<listitem><para>{_inline(" ".join(item))}</para></listitem>'
+                        for item in self._list)
+        self._parts.append(f'<itemizedlist>{items}</itemizedlist>')
+        self._list = None
+
+    def _flush_table(self):
+        if self._table is None:
+            return
+        self._parts.append(_table(self._table))
+        self._table = None
+
+    def _flush_blocks(self):
+        self._flush_section()
+        self._flush_list()
+        self._flush_table()
+
+    def end_para(self):
+        self._flush_blocks()
+        if self._parts:
+            self._paras.append('<para>' + ' '.join(self._parts) + '</para>')
+            self._parts = []
+
+    def feed(self, line):
+        """
+        Convert a single comment line
+
+        :param line: comment line without the comment marker
+        """
+        stripped = line.strip()
+        if self._code is not None:
+            if stripped.startswith(self._fence):
+                self._parts.append(_code(self._code))
+                self._code = None
+            else:
+                self._code.append(line[self._code_indent:] if not line[:self._code_indent].strip()
+                                  else line.lstrip())
+            return
+        match = FENCE_RE.match(stripped)
+        if match is not None:
+            self._flush_blocks()
+            self._fence = match.group(1)[:3]
+            self._code = []
+            self._code_indent = len(line) - len(line.lstrip())
+            return
+        if not stripped:
+            self.end_para()
+            return
+        if stripped.startswith('|'):
+            self._flush_section()
+            self._flush_list()
+            if self._table is None:
+                self._table = []
+            self._table.append(stripped)
+            return
+        self._flush_table()
+        if HRULER_RE.fullmatch(stripped):
+            self._flush_blocks()
+            self._parts.append('<hruler/>')
+            return
+        match = HEADING_RE.fullmatch(stripped)
+        if match is not None:
+            self.end_para()
+            level = len(match.group(1))
+            self._paras.append(f'<heading level="{level}">{_inline(match.group(2))}</heading>')
+            return
+        match = SECTION_RE.match(stripped)
+        if match is not None:
+            self._flush_blocks()
+            kind, text = match.groups()
+            name = ''
+            if kind in ('param', 'tparam', 'throws', 'throw', 'exception'):
+                name, _, text = text.partition(' ')
+            self._section = (kind, name, [text.strip()] if text.strip() else [])
+            return
+        match = LIST_ITEM_RE.fullmatch(stripped)
+        if match is not None and not stripped.startswith('**'):
+            self._flush_section()
+            if self._list is None:
+                self._list = []
+            self._list.append([match.group(1)])
+            return
+        if self._section is not None:
+            self._section[2].append(stripped)
+        elif self._list is not None:
+            self._list[-1].append(stripped)
+        else:
+            self._parts.append(_inline(stripped))
+
+    def close(self):
+        """
+        Finish the conversion
+
+        :return: XML of description contents
+        """
+        if self._code is not None:
+            self._parts.append(_code(self._code))
+            self._code = None
+        self.end_para()
+        return '\n'.join(self._paras)
+
+
+def comment_to_xml(lines):
+    """
+    Convert lines of a Doxygen comment to XML of Doxygen descriptions
+
+    A paragraph that starts with ``@brief`` is the brief description
+    until a blank line, a horizontal ruler or a section command,
+    all other paragraphs are the detailed description.
+
+    :param lines: comment lines without comment markers
+    :return: a tuple of XML contents of the brief and the detailed descriptions
+    """
+    brief = CommentConverter()
+    detailed = CommentConverter()
+    in_brief = False
+    for line in lines:
+        stripped = line.strip()
+        match = BRIEF_RE.match(stripped)
+        if match is not None:
+            in_brief = True
+            line = stripped[match.end():]
+        elif not stripped or HRULER_RE.fullmatch(stripped) or SECTION_RE.match(stripped):
+            in_brief = False
+        (brief if in_brief else detailed).feed(line)
+    return brief.close(), detailed.close()
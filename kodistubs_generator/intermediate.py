@@ -0,0 +1,36 @@
+"""
+Compact intermediate representation of parsed Kodi Python API modules
+
+Module docs objects are stored pickled together with a schema version,
+so that stubs can be rendered again without parsing XML files.
+"""
+import pickle
+
+IR_VERSION = 2
+
+
+def dumps_module_docs(module_docs):
+    """
+    Serialize module docs into the intermediate format
+
+    :param module_docs: :class:`ModuleDocs` object returned by
+        :func:`kodistubs_generator.docsparser.parse_module`
+    :return: serialized module docs
+    """
+    return pickle.dumps({'version': IR_VERSION, 'module': module_docs},
+                        pickle.HIGHEST_PROTOCOL)
+
+
+def load_module_docs(ir_path):
+    """
+    Load module docs saved in the intermediate format
+
+    :param ir_path: path to an intermediate file
+    :return: :class:`ModuleDocs` object
+    :raises ValueError: if the file was saved with another schema version
+    """
+    with ir_path.open('rb') as fo:
+        data = pickle.load(fo)
+    if data.get('version') != IR_VERSION:
+        raise ValueError(f'{ir_path} has unsupported version {data.get("version")}')
+    return data['module']
@@ -0,0 +1,195 @@
+"""
+Content-hash manifest for incremental regeneration of Kodistubs
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+import lxml.etree as etree
+
+from .headerparser import index_headers
+from .modules import SQLITE3_DB, SWIG_XML
+
+MANIFEST_VERSION = 2
+
+
+def hash_file(path):
+    """
+    Calculate SHA-256 hash of a file contents
+
+    :param path: path to a file
+    :return: hex digest of the file contents
+    """
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def hash_files(paths):
+    """
+    Calculate a combined SHA-256 hash of several files
+
+    :param paths: iterable of paths to files
+    :return: hex digest of the files names and contents
+    """
+    hasher = hashlib.sha256()
+    for path in sorted(paths):
+        hasher.update(path.name.encode('utf-8'))
+        hasher.update(path.read_bytes())
+    return hasher.hexdigest()
+
+
+def _scan_group_xml(group_xml):
+    """
+    Extract module name and innergroup refids from a Doxygen group XML file
+    without building a tree
+
+    :param group_xml: path to a group XML file
+    :return: a tuple of the group name and a list of innergroup refids
+    """
+    title = innerclass = None
+    innergroups = []
+    for _, elem in etree.iterparse(str(group_xml), tag=('title', 'innerclass', 'innergroup')):
+        if elem.getparent().tag == 'compounddef':
+            if elem.tag == 'title' and title is None:
+                title = elem.text
+            elif elem.tag == 'innerclass' and innerclass is None:
+                innerclass = elem.text
+            elif elem.tag == 'innergroup':
+                innergroups.append(elem.attrib['refid'])
+        elem.clear()
+    name = innerclass.split('::')[-1] if innerclass is not None else title
+    return name, innergroups
+
+
+def _query_group_name(db_path, refid):
+    """
+    Get a module name of a Doxygen group from a Doxygen SQLite3 database
+
+    :param db_path: path to a Doxygen SQLite3 database
+    :param refid: Doxygen group refid
+    :return: the name of the first class in the group or the group title
+    """
+    with closing(sqlite3.connect(db_path.resolve().as_uri() + '?mode=ro', uri=True)) as db:
+        row = db.execute(
+            "SELECT compounddef.rowid, compounddef.title FROM refid "
+            "JOIN compounddef ON compounddef.rowid = refid.rowid "
+            "WHERE refid.refid = ? AND compounddef.kind = 'group'", (refid,)).fetchone()
+        if row is None:
+            raise ValueError(f'Doxygen group {refid} is not found in {db_path}')
+        innerclass = db.execute(
+            "SELECT compounddef.name FROM contains "
+            "JOIN compounddef ON compounddef.rowid = contains.inner_rowid "
+            "WHERE contains.outer_rowid = ? AND compounddef.kind IN ('class', 'struct') "
+            "ORDER BY contains.rowid LIMIT 1", (row[0],)).fetchone()
+    return innerclass[0].split('::')[-1] if innerclass is not None else row[1]
+
+
+def collect_module_inputs(module, docs_dir, swig_dir, backend='xml'):
+    """
+    Collect hashes of all input files of a Kodi Python API module
+
+    The inputs are the module group XML file, all innergroup XML files
+    it pulls in and the SWIG XML definition of the module. With SQLite3
+    Doxygen output the whole database is an input of every module,
+    and with docs read from headers all Kodi Python API headers are.
+
+    :param module: module group XML file name
+    :param docs_dir: directory where Doxygen docs are located, or the directory
+        with Kodi Python API sources for ``'headers'`` backend
+    :param swig_dir: directory where SWIG XML definitions are located
+    :param backend: docs source, ``'xml'``, ``'sqlite3'`` or ``'headers'``
+    :return: dict of input file paths and their hashes
+    """
+    if backend == 'headers':
+        refid = module[:-len('.xml')]
+        group = index_headers(docs_dir).get(refid)
+        if group is None or group['title'] is None:
+            raise ValueError(f'Doxygen group {refid} is not defined in {docs_dir}')
+        innerclass = group['innerclass']
+        name = innerclass if innerclass is not None else group['title']
+        inputs = {str(path): hash_file(path) for path in sorted(docs_dir.glob('*.h'))}
+        swig_xml = swig_dir / SWIG_XML[name]
+        inputs[str(swig_xml)] = hash_file(swig_xml)
+        return inputs
+    if backend == 'sqlite3':
+        db_path = docs_dir / SQLITE3_DB
+        name = _query_group_name(db_path, module[:-len('.xml')])
+        swig_xml = swig_dir / SWIG_XML[name]
+        return {str(db_path): hash_file(db_path), str(swig_xml): hash_file(swig_xml)}
+    inputs = {}
+    name = None
+    pending = [docs_dir / 'xml' / module]
+    while pending:
+        group_xml = pending.pop()
+        if str(group_xml) in inputs:
+            continue
+        inputs[str(group_xml)] = hash_file(group_xml)
+        group_name, innergroups = _scan_group_xml(group_xml)
+        if name is None:
+            name = group_name
+        pending.extend(docs_dir / 'xml' / (refid + '.xml') for refid in innergroups)
+    swig_xml = swig_dir / SWIG_XML[name]
+    inputs[str(swig_xml)] = hash_file(swig_xml)
+    return inputs
+
+
+def load_manifest(manifest_path):
+    """
+    Load a manifest of previous Kodistubs generation
+
+    :param manifest_path: path to a manifest file
+    :return: manifest dict or an empty manifest if the file does not exist
+        or was created by another manifest version
+    """
+    empty_manifest = {'version': MANIFEST_VERSION, 'code': None, 'templates': None,
+                      'modules': {}}
+    try:
+        with manifest_path.open('r', encoding='utf-8') as fo:
+            manifest = json.load(fo)
+    except (OSError, ValueError):
+        return empty_manifest
+    if manifest.get('version') != MANIFEST_VERSION:
+        return empty_manifest
+    return manifest
+
+
+def save_manifest(manifest_path, manifest):
+    """
+    Save a manifest of Kodistubs generation
+
+    :param manifest_path: path to a manifest file
+    :param manifest: manifest dict
+    """
+    with manifest_path.open('w', encoding='utf-8') as fo:
+        json.dump(manifest, fo, indent=2, sort_keys=True)
+
+
+def write_if_changed(path, content, encoding=None):
+    """
+    Write a file only if its contents differ from the existing file
+
+    The file is written to a temporary file first and then renamed,
+    so readers never see a partially written file.
+
+    :param path: path to an output file
+    :param content: new file contents, ``bytes`` are written in binary mode
+    :param encoding: file encoding
+    :return: True if the file was written
+    """
+    binary = 'b' if isinstance(content, bytes) else ''
+    try:
+        with path.open('r' + binary, encoding=encoding) as fo:
+            if fo.read() == content:
+                return False
+    except (OSError, ValueError):
+        pass
+    temp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        with temp_path.open('w' + binary, encoding=encoding) as fo:
+            fo.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return True
@@ -0,0 +1,142 @@
+"""
+Data model of parsed docs for Kodi Python API modules
+
+Objects of the model are rendered by ``module.py.tpl`` directly
+and are converted to dicts for JSON output with ``to_dict`` methods.
+"""
+from collections import namedtuple
+
+# A documented symbol that is missing from SWIG definitions and is not included
+# in a stub. class_name is None for module-level functions and classes.
+DroppedSymbol = namedtuple('DroppedSymbol', ['module', 'class_name', 'name', 'reason'])
+
+
+class ParameterDocs:
+    """
+    Function parameter
+
+    :param name: parameter name
+    :param type_: Python type annotation or ``None`` for ``self``
+    :param default: default value as Python code or ``None``
+    """
+    __slots__ = ('name', 'type', 'default')
+
+    def __init__(self, name, type_=None, default=None):
+        self.name = name
+        self.type = type_
+        self.default = default
+
+    def __str__(self):
+        if self.type is None:
+            return self.name
+        param = f'{self.name}: {self.type}'
+        if self.default is not None:
+            param += ' = ' + self.default
+        return param
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'type': self.type,
+            'default': self.default,
+        }
+
+
+class FunctionDocs:
+    """
+    Function or method
+
+    Attributes other than the name and the docstring are filled in
+    from SWIG definitions by :func:`kodistubs_generator.swigparser.parse_function`.
+
+    :param name: function name
+    :param docstring: function docstring
+    """
+    __slots__ = ('name', 'docstring', 'return_value', 'parameters', 'params', 'rtype',
+                 'indent', 'params_string')
+
+    def __init__(self, name, docstring=''):
+        self.name = name
+        self.docstring = docstring
+        self.return_value = None
+        self.parameters = []
+        # Parameters as lines of the rendered signature
+        self.params = []
+        self.rtype = None
+        self.indent = 0
+        self.params_string = ''
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'docstring': self.docstring,
+            'return': self.return_value,
+            'params': self.params,
+            'rtype': self.rtype,
+            'indent': self.indent,
+            'params_string': self.params_string,
+            'parameters': [param.to_dict() for param in self.parameters],
+        }
+
+
+class ClassDocs:
+    """
+    Class or Doxygen group with nested classes
+
+    :param name: class name
+    :param docstring: class docstring
+    :param classes: list of nested :class:`ClassDocs`
+    :param functions: list of :class:`FunctionDocs` of class methods
+    """
+    __slots__ = ('name', 'docstring', 'classes', 'functions', 'base_class')
+
+    def __init__(self, name, docstring='', classes=None, functions=None):
+        self.name = name
+        self.docstring = docstring
+        self.classes = classes if classes is not None else []
+        self.functions = functions if functions is not None else []
+        self.base_class = None
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'docstring': self.docstring,
+            'classes': [class_.to_dict() for class_ in self.classes],
+            'functions': [func.to_dict() for func in self.functions],
+            'base_class': self.base_class,
+        }
+
+
+class ModuleDocs:
+    """
+    Kodi Python API module
+
+    :param name: Doxygen group name of the module
+    :param docstring: module docstring
+    :param classes: list of :class:`ClassDocs`
+    :param functions: list of :class:`FunctionDocs` of module functions
+    """
+    __slots__ = ('name', 'docstring', 'classes', 'functions', 'py_name', 'constants',
+                 'dropped')
+
+    def __init__(self, name, docstring='', classes=None, functions=None):
+        self.name = name
+        self.docstring = docstring
+        self.classes = classes if classes is not None else []
+        self.functions = functions if functions is not None else []
+        # Python module name and constants are set from SWIG definitions
+        self.py_name = None
+        self.constants = []
+        # List of DroppedSymbol
+        self.dropped = []
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'docstring': self.docstring,
+            'classes': [class_.to_dict() for class_ in self.classes],
+            'functions': [func.to_dict() for func in self.functions],
+            '__name__': self.py_name,
+            'constants': self.constants,
+            'dropped': [symbol._asdict() for symbol in self.dropped],
+        }
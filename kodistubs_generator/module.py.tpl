@@ -19,21 +19,21 @@ class {{ class.name }}{% if class.base_class %}({{ class.base_class }}){% endif
     {{ class.docstring|indent }}
     """
     {% for method in class.functions %}
-    def {{ method.name }}({{ method.params|join(',\n')|indent(method.indent) }}) -> {{ method.rtype }}:
+    def {{ method.name }}({{ method.params_string }}) -> {{ method.rtype }}:
         {%- if method.docstring %}
         """
         {{ method.docstring|indent(width=8) }}
         """
         {%- endif %}
-        {{ method.return }}
+        {{ method.return_value }}
     {% endfor %}
 {% endfor %}
 
 {% for func in module.functions %}
-def {{ func.name }}({{ func.params|join(',\n')|indent(func.indent)}}) -> {{ func.rtype }}:
+def {{ func.name }}({{ func.params_string }}) -> {{ func.rtype }}:
     """
     {{ func.docstring|indent }}
     """
-    {{ func.return }}
+    {{ func.return_value }}
 
 {% endfor %}
@@ -0,0 +1,29 @@
+"""
+Kodi Python API modules and their source files
+
+This module has no heavy dependencies, so it can be imported
+without loading the parsers.
+"""
+
+# Doxygen group XML files of Kodi Python API modules
+MODULES = [
+    'group__python__xbmc.xml',
+    'group__python__xbmcaddon.xml',
+    'group__python__xbmcgui.xml',
+    'group__python__xbmcplugin.xml',
+    'group__python__xbmcvfs.xml',
+    'group__python__xbmcdrm.xml',
+]
+
+# SWIG XML definitions of modules by their Doxygen group names
+SWIG_XML = {
+    'Library - xbmc': 'AddonModuleXbmc.i.xml',
+    'Addon': 'AddonModuleXbmcaddon.i.xml',
+    'Library - xbmcgui': 'AddonModuleXbmcgui.i.xml',
+    'Library - xbmcplugin': 'AddonModuleXbmcplugin.i.xml',
+    'Library - xbmcvfs': 'AddonModuleXbmcvfs.i.xml',
+    'CryptoSession': 'AddonModuleXbmcdrm.i.xml',
+}
+
+# Doxygen SQLite3 database relative to the Doxygen output directory
+SQLITE3_DB = 'sqlite3/doxygen_sqlite3.db'
@@ -0,0 +1,164 @@
+"""
+Per-stage timing and memory profiling of Kodistubs generation
+"""
+import cProfile
+import json
+import resource
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+
+class Profiler:
+    """
+    Collects wall time and peak traced memory of generation stages
+    and call counts of hot functions
+
+    The profiler does nothing until :meth:`start` is called.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = []
+        self.calls = Counter()
+        self._cprofile = None
+
+    def start(self, cprofile=False):
+        """
+        Start profiling and discard previously collected data
+
+        :param cprofile: also collect :mod:`cProfile` statistics
+        """
+        self.enabled = True
+        self.stages = []
+        self.calls = Counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def stop(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        tracemalloc.stop()
+        self.enabled = False
+
+    @contextmanager
+    def stage(self, name, module=None):
+        """
+        Measure a generation stage
+
+        :param name: stage name
+        :param module: module group XML file name if the stage
+            processes a single module
+        """
+        if not self.enabled:
+            yield
+            return
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append({
+                'stage': name,
+                'module': module,
+                'wall_time': time.perf_counter() - start,
+                'peak_memory': tracemalloc.get_traced_memory()[1],
+            })
+
+    def add_stage(self, name, wall_time, module=None):
+        """
+        Add a stage measured elsewhere, e.g. in a background thread
+
+        Peak memory of such stages is not known and is reported as ``None``.
+
+        :param name: stage name
+        :param wall_time: stage time in seconds
+        :param module: module group XML file name if the stage
+            processes a single module
+        """
+        if self.enabled:
+            self.stages.append({
+                'stage': name,
+                'module': module,
+                'wall_time': wall_time,
+                'peak_memory': None,
+            })
+
+    def collect(self):
+        """
+        Collect and reset profiling data, e.g. in a worker process
+
+        :return: a tuple of stage records and call counts
+        """
+        data = self.stages, dict(self.calls)
+        self.stages = []
+        self.calls = Counter()
+        return data
+
+    def merge(self, data):
+        """
+        Merge profiling data collected by :meth:`collect` in another process
+
+        :param data: a tuple of stage records and call counts
+        """
+        stages, calls = data
+        self.stages += stages
+        self.calls.update(calls)
+
+    def report(self):
+        """
+        Create a machine-readable profiling report
+
+        :return: report dict
+        """
+        totals = {}
+        for record in self.stages:
+            total = totals.setdefault(record['stage'], {'wall_time': 0.0, 'peak_memory': None})
+            total['wall_time'] += record['wall_time']
+            if record['peak_memory'] is not None:
+                total['peak_memory'] = max(total['peak_memory'] or 0, record['peak_memory'])
+        return {
+            'stages': self.stages,
+            'totals': totals,
+            'calls': dict(sorted(self.calls.items())),
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'children_max_rss_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        }
+
+    def save(self, report_path, stats_path=None):
+        """
+        Save the profiling report and optional :mod:`cProfile` statistics
+
+        :param report_path: path to a JSON report file
+        :param stats_path: path to a :mod:`pstats` dump file
+        """
+        with report_path.open('w', encoding='utf-8') as fo:
+            json.dump(self.report(), fo, indent=2)
+        if stats_path is not None and self._cprofile is not None:
+            self._cprofile.dump_stats(str(stats_path))
+
+
+profiler = Profiler()
+
+
+def count_calls(func):
+    """
+    Count calls to a function while profiling is enabled
+
+    :param func: a function to wrap
+    :return: wrapped function
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if profiler.enabled:
+            profiler.calls[name] += 1
+        return func(*args, **kwargs)
+
+    return wrapper
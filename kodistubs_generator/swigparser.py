@@ -1,121 +1,15 @@
 """
 Parser for SWIG-generated XML definitions of Kodi Python API modules
 """
-import re
 
 import lxml.etree as etree
 
+from .cache import parse_cache, translation_cache
 from .docstrings_parser.elements import LINE_LENGTH
-
-SWIG_XML = {
-    'Library - xbmc': 'AddonModuleXbmc.i.xml',
-    'Addon': 'AddonModuleXbmcaddon.i.xml',
-    'Library - xbmcgui': 'AddonModuleXbmcgui.i.xml',
-    'Library - xbmcplugin': 'AddonModuleXbmcplugin.i.xml',
-    'Library - xbmcvfs': 'AddonModuleXbmcvfs.i.xml',
-    'CryptoSession': 'AddonModuleXbmcdrm.i.xml',
-}
-
-# For similar patterns longer patterns should precede shorter ones
-DECL_TYPE_SUBS = [
-    (re.compile(r'r\.q\(const\)\.XBMCAddon::xbmcgui::InfoLabelDict'), 'Dict[str, str]'),
-    (re.compile(r'r\.q\(const\)\.XBMCAddon::Properties'), 'Dict[str, str]'),
-    (re.compile(r'r\.q\(const\)\.std::vector<\(XBMCAddon::Properties\)>'), 'List[Dict[str, str]]'),
-    (re.compile(r'r\.q\(const\)\.std::vector<\(Tuple<\(XBMCAddon::String,p\.q\(const\)\.XBMCAddon::xbmcgui::ListItem,bool\)>\)>'),
-        'List[Tuple[str, ListItem, bool]]'),
-    (re.compile(r'r\.q\(const\)\.std::vector<\(Tuple<\(XBMCAddon::String,XBMCAddon::String\)>\)>'), 'List[Tuple[str, str]]'),
-    (re.compile(r'r\.q\(const\)\.std::vector<\(Alternative<\(XBMCAddon::String,p\.q\(const\)\.XBMCAddon::xbmcgui::ListItem\)>\)>'),
-        'List[Union[str, ListItem]]'),
-    (re.compile(r'r\.q\(const\)\.std::map<\(XBMCAddon::String,Tuple<\(float,int\)>\)>'), 'Dict[str, Tuple[float,int]]'),
-    (re.compile(r'r\.q\(const\)\.Alternative<\(XBMCAddon::String,p\.q\(const\)\.XBMCAddon::xbmcgui::ListItem\)>'),
-        'Union[str, ListItem]'),
-    (re.compile(r'r\.q\(const\)\.Alternative<\(XBMCAddon::String,p\.q\(const\)\.ListItem\)>'), 'Union[str, ListItem]'),
-    (re.compile(r'r\.q\(const\)\.std::vector<\(XBMCAddon::String\)>'), 'List[str]'),
-    (re.compile(r'r\.q\(const\)\.std::vector<\(p\.q\(const\)\.XBMCAddon::xbmc::Actor\)>'), 'List[Actor]'),
-    (re.compile(r'r\.q\(const\)\.std::vector<\(Tuple<\(int,std::string\)>\)>'), 'List[Tuple[int, str]]'),
-    (re.compile(r'r\.q\(const\)\.std::vector<\(int\)>'), 'List[int]'),
-    (re.compile(r'r\.q\(const\)\.std::map<\(XBMCAddon::String,XBMCAddon::String\)>'), 'Dict[str, str]'),
-    (re.compile(r'std::vector<\(p.XBMCAddon::xbmcgui::Control\)>'), 'List[Control]'),
-    (re.compile(r'std::vector<\(XBMCAddon::String\)>'), 'List[str]'),
-    (re.compile(r'p\.q\(const\)\.XBMCAddon::xbmcgui::Control'), 'Control'),
-    (re.compile(r'p\.q\(const\)\.XBMCAddon::xbmc::VideoStreamDetail'), 'VideoStreamDetail'),
-    (re.compile(r'p\.q\(const\)\.XBMCAddon::xbmc::AudioStreamDetail'), 'AudioStreamDetail'),
-    (re.compile(r'p\.q\(const\)\.XBMCAddon::xbmc::SubtitleStreamDetail'), 'SubtitleStreamDetail'),
-    (re.compile(r'r\.q\(const\)\.std::vector<\(p\.q\(const\)\.XBMCAddon::xbmcgui::ListItem\)>'), 'List[ListItem]'),
-    (re.compile(r'p\.XBMCAddon::xbmcgui::Control'), 'Control'),
-    (re.compile(r'p\.XBMCAddon::xbmc::Actor'), 'Actor'),
-    (re.compile(r'r?\.?q\(const\)\.XBMCAddon::String'), 'str'),
-    (re.compile(r'p\.XBMCAddon::xbmcgui::Action'), 'Action'),
-    (re.compile(r'XBMCAddon::String'), 'str'),
-    (re.compile(r'r?\.?q\(const\)\.String'), 'str'),
-    (re.compile(r'r\.q\(const\)\.std::string'), 'str'),
-    (re.compile(r'r\.q\(const\)\.std::vector<\(bool\)>'), 'List[bool]'),
-    (re.compile(r'r\.q\(const\)\.std::vector<\(double\)>'), 'List[float]'),
-    (re.compile(r'String'), 'str'),
-    (re.compile(r'std::string'), 'str'),
-    (re.compile(r'p\.q\(const\)\.XBMCAddon::xbmcgui::ListItemList'), 'List[ListItem]'),
-    (re.compile(r'p\.q\(const\)\.XBMCAddon::xbmcgui::ListItem'), 'ListItem'),
-    (re.compile(r'p\.XBMCAddon::xbmcgui::ListItem'), 'ListItem'),
-    (re.compile(r'XBMCAddon::xbmcgui::ListItem'), 'ListItem'),
-    (re.compile(r'p\.q\(const\)\.ListItem'), 'ListItem'),
-    (re.compile(r'r\.q\(const\)\.XBMCAddon::xbmc::PlayParameter'), 'Union[str, PlayList]'),
-    (re.compile(r'p\.q\(const\)\.PlayList'), 'PlayList'),
-    (re.compile(r'r\.q\(const\)\.XbmcCommons::Buffer'), 'Union[str, bytes, bytearray]'),
-    (re.compile(r'r\.XbmcCommons::Buffer'), 'Union[str, bytes, bytearray]'),
-    (re.compile(r'long long'), 'int'),
-    (re.compile(r'long'), 'int'),
-    (re.compile(r'double'), 'float'),
-    (re.compile('unsigned int'), 'int'),
-    (re.compile(r'p\.q\(const\)\.char'), 'str'),
-    (re.compile(r'q\(const\)\.'), ''),
-    (re.compile(r',(\S)'), r', \1'),
-    (re.compile(r'r\.std::map<\(str, str, std::less<\(\)>\)>'), 'Dict[str, str]'),
-    (re.compile(r'r\.std::vector<\(Tuple<\(int, str, str\)>\)>'), 'Tuple[int, str, str]'),
-]
-
-RET_TYPE_SUBS = [
-    (re.compile(r'void'), 'None'),
-    (re.compile(r'double'), 'float'),
-    (re.compile(r'long long'), 'int'),
-    (re.compile(r'long'), 'int'),
-    (re.compile(r'unsigned int'), 'int'),
-    (re.compile(r'xbmc::InfoTagVideo'), 'InfoTagVideo'),
-    (re.compile(r'xbmc::InfoTagMusic'), 'InfoTagMusic'),
-    (re.compile(r'xbmc::InfoTagPicture'), 'InfoTagPicture'),
-    (re.compile(r'xbmc::InfoTagGame'), 'InfoTagGame'),
-    (re.compile(r'XBMCAddon::xbmcgui::ListItem'), 'ListItem'),
-    (re.compile(r'XBMCAddon::xbmcgui::Control'), 'Control'),
-    (re.compile(r'std::unique_ptr<\(std::vector<\(int\)>\)>'), 'List[int]'),
-    (re.compile(r'Alternative<\(XBMCAddon::String,std::vector<\(XBMCAddon::String\)>\)>'), 'Union[str, List[str]]'),
-    (re.compile(r'std::vector<\(std::string\)>'), 'List[str]'),
-    (re.compile(r'p\.XBMCAddon::xbmc::Actor'), 'Actor'),
-    (re.compile(r'XBMCAddon::String'), 'str'),
-    (re.compile(r'std::vector'), 'List'),
-    (re.compile(r'q\(const\)\.char'), 'str'),
-    (re.compile(r'XbmcCommons::Buffer'), 'bytearray'),
-    (re.compile(r'<\('), '['),
-    (re.compile(r'\)>'), ']'),
-    (re.compile(r',(\S)'), r', \1'),
-]
-
-VALUE_SUBS = [
-    (re.compile(r'false'), 'False'),
-    (re.compile(r'true'), 'True'),
-    (re.compile(r'XBFONT_LEFT'), '0'),
-    (re.compile(r'XBFONT_CENTER_Y'), '4'),
-    (re.compile(r'lLOGDEBUG'), 'LOGDEBUG'),
-    (re.compile(r'CLangCodeExpander::ENGLISH_NAME'), 'ENGLISH_NAME'),
-    (re.compile(r'XBMCAddon::emptyString'), '""'),
-    (re.compile(r'double'), 'float'),
-    (re.compile(r'Player::defaultPlayParameter'), '""'),
-    (re.compile(r'std::vector< int >\(\)'), 'None'),
-    (re.compile(r'NULL'), 'None'),
-    (re.compile(r'XBMCAddon::xbmcgui::INPUT_ALPHANUM'), 'INPUT_ALPHANUM'),
-    (re.compile(r'SEEK_SET'), '0'),
-    (re.compile(r'CONTROL_NO_BUTTON'), 'DLG_YESNO_NO_BTN'),
-    (re.compile(r'std::vector< XBMCAddon::xbmcgui::ListItem const \* >\(\)'), '()'),
-    (re.compile(r'INT_MAX'), '2147483647'),
-]
+from .model import DroppedSymbol, FunctionDocs, ParameterDocs
+from .modules import SWIG_XML
+from .profiling import count_calls
+from .swigtypes import translate_decl_type, translate_ret_type, translate_value
 
 RET_VALUE_SUBS = {
     'None': 'pass',
@@ -150,9 +44,9 @@ BASE_CLASS_SUBS = [
     ('AddonCallback', ''),
 ]
 
-DECL = set()
-
 
+@count_calls
+@translation_cache.memoize
 def clean_type(decl):
     """
     Convert SWIG type declarations for arguments to Python types
@@ -160,11 +54,11 @@ def clean_type(decl):
     :param decl: SWIG argument type
     :return: Python argument type
     """
-    for sub in DECL_TYPE_SUBS:
-        decl = sub[0].sub(sub[1], decl)
-    return decl
+    return translate_decl_type(decl)
 
 
+@count_calls
+@translation_cache.memoize
 def clean_value(val):
     """
     Convert C++ default arguments to Python
@@ -172,11 +66,11 @@ def clean_value(val):
     :param val: C++ argument as string
     :return: Python argument
     """
-    for sub in VALUE_SUBS:
-        val = sub[0].sub(sub[1], val)
-    return val
+    return translate_value(val)
 
 
+@count_calls
+@translation_cache.memoize
 def clean_rtype(rtype):
     """
     Convert SWIG return types to Python
@@ -184,9 +78,7 @@ def clean_rtype(rtype):
     :param rtype: SWIG return type
     :return: Python return type
     """
-    for sub in RET_TYPE_SUBS:
-        rtype = sub[0].sub(sub[1], rtype)
-    return rtype
+    return translate_ret_type(rtype)
 
 
 def clean_retvalue(retvalue):
@@ -213,46 +105,163 @@ def clean_base_class(base_class):
     return base_class
 
 
-def parse_function(func_doc, attributelist_tag, is_method=False):
+def _collect_attributes(attributelist_tag):
+    """
+    Collect SWIG attributes of a symbol into a dict
+
+    Only the first occurrence of an attribute is kept. Parameter and base class
+    lists are stored under ``parmlist`` and ``baselist`` keys respectively.
+
+    :param attributelist_tag: etree node with symbol attributes
+    :return: dict of symbol attributes
+    """
+    attributes = {}
+    for child in attributelist_tag:
+        if child.tag == 'attribute':
+            attributes.setdefault(child.attrib['name'], child.attrib.get('value'))
+        elif child.tag == 'parmlist' and 'parmlist' not in attributes:
+            attributes['parmlist'] = [
+                _collect_attributes(parm_tag.find('attributelist'))
+                for parm_tag in child.iterchildren('parm')
+            ]
+        elif child.tag == 'baselist' and 'baselist' not in attributes:
+            attributes['baselist'] = [base_tag.attrib['name']
+                                      for base_tag in child.iterchildren('base')]
+    return attributes
+
+
+SYMBOL_TAGS = ('constant', 'class', 'cdecl', 'constructor')
+# Elements that are never needed but are released as soon as they are parsed
+SKIPPED_TAGS = ('typemap', 'insert', 'fragment', 'apply', 'clear')
+
+
+def _release_element(elem):
     """
-    Parse an etree node with a function definition
+    Free memory used by a processed element and its preceding siblings
 
-    :param func_doc: docs dict for the function
-    :param attributelist_tag: etree node with function definition
+    The attributelist of the parent element is kept, as the parent
+    may not be processed yet.
+
+    :param elem: etree node received from :func:`etree.iterparse`
+    """
+    elem.clear()
+    previous = elem.getprevious()
+    while previous is not None and previous.tag != 'attributelist':
+        elem.getparent().remove(previous)
+        previous = elem.getprevious()
+
+
+def load_swig_index(swig_xml):
+    """
+    Parse a SWIG XML definition file and build its index
+
+    The file is parsed incrementally and only symbol elements are processed.
+    Typemaps and processed symbols are released as soon as they are parsed,
+    so the full document tree is never built.
+
+    Classes, methods and functions are indexed by their Python names (``sym_name``)
+    and also by their C++ names, so that symbols renamed with SWIG ``%rename``
+    are found by their documented names. Python names take priority.
+
+    :param swig_xml: path to a SWIG XML file
+    :return: index dict with module name, constants, module-level functions
+        and classes with their methods and constructors
+    """
+    index = {
+        'name': None,
+        'constants': [],
+        'functions': {},
+        'classes': {},
+    }
+    class_indexes = {}
+    # Tuples of (symbols dict, C++ name, symbol) added after all Python names
+    aliases = []
+
+    def get_class_index(class_elem):
+        # A class is indexed when its first member is parsed,
+        # its attributelist always precedes its members
+        if class_elem not in class_indexes:
+            attributelist_tag = class_elem.find('attributelist')
+            class_index = None
+            if attributelist_tag is not None:
+                attributes = _collect_attributes(attributelist_tag)
+                if attributes.get('sym_name') is not None:
+                    class_index = index['classes'].setdefault(attributes['sym_name'], {
+                        'baselist': attributes.get('baselist', []),
+                        'methods': {},
+                        'constructor': None,
+                    })
+                    if attributes.get('name') is not None:
+                        aliases.append((index['classes'], attributes['name'], class_index))
+            class_indexes[class_elem] = class_index
+        return class_indexes[class_elem]
+
+    def add_symbol(symbols, attributes):
+        symbols.setdefault(attributes['sym_name'], attributes)
+        if attributes.get('name') is not None:
+            aliases.append((symbols, attributes['name'], attributes))
+
+    for _, elem in etree.iterparse(str(swig_xml), tag=SYMBOL_TAGS + SKIPPED_TAGS):
+        if index['name'] is None:
+            root_tag = elem.getroottree().getroot()
+            index['name'] = _collect_attributes(root_tag.find('attributelist'))['name']
+        if elem.tag == 'class':
+            get_class_index(elem)
+        elif elem.tag in SYMBOL_TAGS:
+            attributelist_tag = elem.find('attributelist')
+            attributes = (_collect_attributes(attributelist_tag)
+                          if attributelist_tag is not None else {})
+            sym_name = attributes.get('sym_name')
+            if sym_name is not None:
+                parent_tag = elem.getparent()
+                class_index = get_class_index(parent_tag) if parent_tag.tag == 'class' else None
+                if elem.tag == 'constant':
+                    index['constants'].append(sym_name)
+                elif class_index is not None:
+                    if elem.tag == 'constructor':
+                        if class_index['constructor'] is None:
+                            class_index['constructor'] = attributes
+                    else:
+                        add_symbol(class_index['methods'], attributes)
+                elif elem.tag == 'cdecl' and next(elem.iterancestors('class'), None) is None:
+                    add_symbol(index['functions'], attributes)
+        _release_element(elem)
+    for symbols, name, symbol in aliases:
+        symbols.setdefault(name, symbol)
+    return index
+
+
+@count_calls
+def parse_function(func_doc, func_def, is_method=False):
+    """
+    Parse a SWIG function definition
+
+    :param func_doc: :class:`FunctionDocs` object for the function
+    :param func_def: dict of SWIG function attributes
     :param is_method: True if this is a method of a class
     """
-    rtype_tags = attributelist_tag.xpath('./attribute[@name="type"]')
-    if rtype_tags:
-        rtype = clean_rtype(rtype_tags[0].attrib['value'])
+    if func_def.get('type') is not None:
+        rtype = clean_rtype(func_def['type'])
     else:
         rtype = 'None'
-    if rtype == 'str':
-        unicode_tag = attributelist_tag.xpath('./attribute[@name="feature_python_coerceToUnicode"]')
-        if unicode_tag:
-            rtype = 'unicode'
-    func_doc['return'] = clean_retvalue(rtype)
-    param_tags = attributelist_tag.xpath('./parmlist/parm/attributelist')
-    params = []
+    if rtype == 'str' and 'feature_python_coerceToUnicode' in func_def:
+        rtype = 'unicode'
+    func_doc.return_value = clean_retvalue(rtype)
+    parameters = []
     if is_method:
-        params.append('self')
-    if param_tags:
-        for param_tag in param_tags:
-            param = param_tag.xpath('./attribute[@name="name"]')[0].attrib['value']
-            param_type = param_tag.xpath('./attribute[@name="type"]')[0].attrib['value']
-            param_type = clean_type(param_type).strip()
-            value_tag = param_tag.xpath('./attribute[@name="value"]')
-            if value_tag:
-                param_value = clean_value(value_tag[0].attrib['value'])
-            else:
-                param_value = None
-            if param_value == 'None':
-                param_type = f'Optional[{param_type}]'
-            param += ': ' + param_type
-            if param_value is not None:
-                param += ' = ' + param_value
-            params.append(param)
+        parameters.append(ParameterDocs('self'))
+    for param_def in func_def.get('parmlist', []):
+        param_type = clean_type(param_def['type']).strip()
+        if param_def.get('value') is not None:
+            param_value = clean_value(param_def['value'])
+        else:
+            param_value = None
+        if param_value == 'None':
+            param_type = f'Optional[{param_type}]'
+        parameters.append(ParameterDocs(param_def['name'], param_type, param_value))
+    params = [str(param) for param in parameters]
     joined_params = ', '.join(params)
-    signature_string = f'def {func_doc["name"]}({joined_params}) -> {rtype}:'
+    signature_string = f'def {func_doc.name}({joined_params}) -> {rtype}:'
     if len(signature_string) <= LINE_LENGTH - 4:
         params.clear()
         params.append(joined_params)
@@ -260,63 +269,62 @@ def parse_function(func_doc, attributelist_tag, is_method=False):
         params[0] = ', '.join(params[:2])
         params.pop(1)
     # Rename xbmcvfs.Stat.atime, mtime and ctime methods
-    if func_doc['name'] in {'atime', 'mtime', 'ctime'}:
-        func_doc['name'] = 'st_' + func_doc['name']
-    func_doc['params'] = params
-    func_doc['rtype'] = rtype
+    if func_doc.name in {'atime', 'mtime', 'ctime'}:
+        func_doc.name = 'st_' + func_doc.name
+    func_doc.parameters = parameters
+    func_doc.params = params
+    func_doc.rtype = rtype
     offset = 5 if is_method else 1
-    func_doc['indent'] = len('def ' + func_doc['name']) + offset
+    func_doc.indent = len('def ' + func_doc.name) + offset
+    # Parameters as they are rendered in the function signature of a stub
+    func_doc.params_string = (',\n' + ' ' * func_doc.indent).join(params)
 
 
 def parse_swig_xml(module_docs, swig_dir):
     """
     Parse SWIG-generated module definition
 
-    :param module_docs: docs dictionary object
+    Documented functions, classes and methods that are missing from
+    the SWIG definition are dropped and recorded in ``module_docs.dropped``.
+
+    :param module_docs: :class:`ModuleDocs` object
     :param swig_dir: directory where SWIG XML definitions are located
-    :return:
     """
-    swig_xml = swig_dir / SWIG_XML[module_docs['name']]
-    root_tag = etree.parse(swig_xml)
-    module_docs['__name__'] = root_tag.xpath(
-        '/top/attributelist/attribute[@name="name"]'
-    )[0].attrib['value']
-    const_tags = root_tag.xpath('//constant/attributelist/attribute[@name="sym_name"]')
-    constants = []
-    for const_tag in const_tags:
-        constants.append(const_tag.attrib['value'] + ' = 0')
-    module_docs['constants'] = constants
-    for func_doc in module_docs['functions'][:]:
-        try:
-            attributelist_tag = root_tag.xpath(f'//cdecl/attributelist/attribute[@value="{func_doc["name"]}"]/..')[0]
-        except IndexError:
-            print(f'{func_doc["name"]} not found in {SWIG_XML[module_docs["name"]]}')
-            module_docs['functions'].remove(func_doc)
+    swig_file = SWIG_XML[module_docs.name]
+    swig_index = parse_cache.get('swig', swig_dir / swig_file, load_swig_index)
+    module_name = module_docs.py_name = swig_index['name']
+    module_docs.constants = [const + ' = 0' for const in swig_index['constants']]
+    reason = f'not found in {swig_file}'
+    dropped = []
+    functions = []
+    for func_doc in module_docs.functions:
+        func_def = swig_index['functions'].get(func_doc.name)
+        if func_def is None:
+            dropped.append(DroppedSymbol(module_name, None, func_doc.name, reason))
             continue
-        parse_function(func_doc, attributelist_tag)
-    for class_doc in module_docs['classes'][:]:
-        try:
-            class_attrib_list_tag = root_tag.xpath(
-                f'//class/attributelist/attribute[@value="{class_doc["name"]}"]/..')[0]
-        except IndexError:
-            print(f'{class_doc["name"]} not found in {SWIG_XML[module_docs["name"]]}')
-            module_docs['classes'].remove(class_doc)
+        parse_function(func_doc, func_def)
+        functions.append(func_doc)
+    module_docs.functions = functions
+    classes = []
+    for class_doc in module_docs.classes:
+        class_index = swig_index['classes'].get(class_doc.name)
+        if class_index is None:
+            dropped.append(DroppedSymbol(module_name, None, class_doc.name, reason))
             continue
-        base_class_tag = class_attrib_list_tag.xpath('./baselist/base')[0]
-        class_doc['base_class'] = clean_base_class(base_class_tag.attrib['name'])
-        for meth_doc in class_doc['functions'][:]:
-            attributelist_tag = root_tag.xpath(
-                f'//class/attributelist/attribute[@name="sym_name" and @value="{class_doc["name"]}"]'
-                f'/../../cdecl/attributelist/attribute[@value="{meth_doc["name"]}"]/..')
-            try:
-                parse_function(meth_doc, attributelist_tag[0], True)
-            except IndexError:
-                class_doc['functions'].remove(meth_doc)
+        class_doc.base_class = clean_base_class(class_index['baselist'][0])
+        methods = []
+        if class_index['constructor'] is not None:
+            init_doc = FunctionDocs('__init__')
+            parse_function(init_doc, class_index['constructor'], True)
+            methods.append(init_doc)
+        for meth_doc in class_doc.functions:
+            meth_def = class_index['methods'].get(meth_doc.name)
+            if meth_def is None:
+                dropped.append(DroppedSymbol(module_name, class_doc.name, meth_doc.name, reason))
                 continue
-        constructor_tag = root_tag.xpath(
-            f'//constructor/attributelist/attribute[@value="{class_doc["name"]}"]/..'
-        )
-        if constructor_tag:
-            init_doc = {'name': '__init__', 'docstring': ''}
-            parse_function(init_doc, constructor_tag[0], True)
-            class_doc['functions'].insert(0, init_doc)
+            parse_function(meth_doc, meth_def, True)
+            methods.append(meth_doc)
+        class_doc.functions = methods
+        classes.append(class_doc)
+    module_docs.classes = classes
+    module_docs.dropped = dropped
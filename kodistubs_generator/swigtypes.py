@@ -0,0 +1,207 @@
+"""
+Translator of SWIG type declarations and C++ default values to Python
+
+SWIG encodes C++ types in a small mini-language, e.g.
+``r.q(const).std::vector<(XBMCAddon::String)>`` for
+``const std::vector<XBMCAddon::String>&``. A type declaration is tokenized,
+parsed into a tree of :class:`TypeNode` objects and then mapped
+to a Python typing expression node by node.
+"""
+import re
+from collections import namedtuple
+
+TypeNode = namedtuple('TypeNode', ['name', 'args', 'qualifiers'])
+
+TYPE_TOKEN_RE = re.compile(r"""
+    (?P<qualifier>[rp]\.|q\([^)]*\)\.)  # reference, pointer or cv-qualifier
+    |(?P<open><\()                      # start of template arguments
+    |(?P<close>\)>)                     # end of template arguments
+    |(?P<comma>,)
+    |(?P<name>[A-Za-z_]\w*(?:::\w+)*(?:[ ]+[A-Za-z_]\w*)*)  # possibly multi-word
+    |(?P<space>\s+)
+""", re.X)
+
+VALUE_TOKEN_RE = re.compile(r'[A-Za-z_]\w*(?:::\w+)*')
+
+# Mapping of unqualified C++ type names to Python types
+TYPE_NAMES = {
+    'void': 'None',
+    'String': 'str',
+    'string': 'str',
+    'char': 'str',
+    'double': 'float',
+    'Properties': 'Dict[str, str]',
+    'InfoLabelDict': 'Dict[str, str]',
+    'ListItemList': 'List[ListItem]',
+    'PlayParameter': 'Union[str, PlayList]',
+    'Buffer': 'Union[str, bytes, bytearray]',
+}
+
+# C++ integer types in all their signed and unsigned spellings
+INTEGER_TYPES = ('int', 'short', 'short int', 'long', 'long int', 'long long', 'long long int')
+TYPE_NAMES.update({f'{sign}{name}': 'int' for sign in ('', 'signed ', 'unsigned ')
+                   for name in INTEGER_TYPES})
+TYPE_NAMES.update(signed='int', unsigned='int')
+
+RET_TYPE_NAMES = dict(TYPE_NAMES, Buffer='bytearray')
+
+# Mapping of C++ class templates to Python generic types
+GENERIC_TYPES = {
+    'vector': 'List',
+    'map': 'Dict',
+    'Tuple': 'Tuple',
+    'Alternative': 'Union',
+}
+
+# Class templates that are represented by their template argument
+TRANSPARENT_TYPES = {'unique_ptr', 'shared_ptr'}
+
+# Template arguments that have no Python counterpart
+IGNORED_TYPE_ARGS = {'less', 'allocator'}
+
+# Kodi-specific exceptions for reference arguments
+DECL_TYPE_OVERRIDES = {
+    'List[Tuple[int, str, str]]': 'Tuple[int, str, str]',
+}
+
+VALUE_NAMES = {
+    'false': 'False',
+    'true': 'True',
+    'NULL': 'None',
+    'double': 'float',
+    'XBFONT_LEFT': '0',
+    'XBFONT_CENTER_Y': '4',
+    'lLOGDEBUG': 'LOGDEBUG',
+    'CLangCodeExpander::ENGLISH_NAME': 'ENGLISH_NAME',
+    'XBMCAddon::emptyString': '""',
+    'Player::defaultPlayParameter': '""',
+    'XBMCAddon::xbmcgui::INPUT_ALPHANUM': 'INPUT_ALPHANUM',
+    'SEEK_SET': '0',
+    'CONTROL_NO_BUTTON': 'DLG_YESNO_NO_BTN',
+    'INT_MAX': '2147483647',
+}
+
+VALUE_EXPRESSIONS = {
+    'std::vector< int >()': 'None',
+    'std::vector< XBMCAddon::xbmcgui::ListItem const * >()': '()',
+}
+
+
+def tokenize_type(decl):
+    """
+    Split a SWIG type declaration into tokens
+
+    :param decl: SWIG type declaration
+    :return: list of (kind, value) tuples
+    :raises ValueError: if the declaration contains an unknown token
+    """
+    tokens = []
+    pos = 0
+    while pos < len(decl):
+        match = TYPE_TOKEN_RE.match(decl, pos)
+        if match is None:
+            raise ValueError(f'Unexpected character at {pos} in "{decl}"')
+        if match.lastgroup != 'space':
+            tokens.append((match.lastgroup, match.group()))
+        pos = match.end()
+    return tokens
+
+
+def _parse_node(tokens, pos):
+    qualifiers = []
+    while pos < len(tokens) and tokens[pos][0] == 'qualifier':
+        qualifier = tokens[pos][1]
+        qualifiers.append(qualifier[2:-2] if qualifier.startswith('q') else qualifier[0])
+        pos += 1
+    if pos >= len(tokens) or tokens[pos][0] != 'name':
+        raise ValueError('Type name expected')
+    name = tokens[pos][1]
+    pos += 1
+    args = []
+    if pos < len(tokens) and tokens[pos][0] == 'open':
+        pos += 1
+        while pos < len(tokens) and tokens[pos][0] != 'close':
+            arg, pos = _parse_node(tokens, pos)
+            args.append(arg)
+            if pos < len(tokens) and tokens[pos][0] == 'comma':
+                pos += 1
+        if pos >= len(tokens):
+            raise ValueError('Unterminated template arguments')
+        pos += 1
+    return TypeNode(name, tuple(args), tuple(qualifiers)), pos
+
+
+def parse_type(decl):
+    """
+    Parse a SWIG type declaration into a type tree
+
+    :param decl: SWIG type declaration
+    :return: root :class:`TypeNode`
+    :raises ValueError: if the declaration cannot be parsed
+    """
+    tokens = tokenize_type(decl)
+    node, pos = _parse_node(tokens, 0)
+    if pos != len(tokens):
+        raise ValueError(f'Unexpected trailing tokens in "{decl}"')
+    return node
+
+
+def translate_type(node, type_names):
+    """
+    Map a type tree to a Python typing expression
+
+    :param node: :class:`TypeNode`
+    :param type_names: mapping of unqualified C++ type names to Python types
+    :return: Python type as a string
+    """
+    name = node.name.split('::')[-1]
+    args = [translate_type(arg, type_names) for arg in node.args
+            if arg.name.split('::')[-1] not in IGNORED_TYPE_ARGS]
+    if name in TRANSPARENT_TYPES and len(args) == 1:
+        return args[0]
+    if args:
+        return f'{GENERIC_TYPES.get(name, name)}[{", ".join(args)}]'
+    return type_names.get(name, name)
+
+
+def translate_decl_type(decl):
+    """
+    Convert SWIG type declarations for arguments to Python types
+
+    :param decl: SWIG argument type
+    :return: Python argument type
+    """
+    try:
+        node = parse_type(decl)
+    except ValueError:
+        return decl
+    py_type = translate_type(node, TYPE_NAMES)
+    if 'r' in node.qualifiers:
+        py_type = DECL_TYPE_OVERRIDES.get(py_type, py_type)
+    return py_type
+
+
+def translate_ret_type(rtype):
+    """
+    Convert SWIG return types to Python
+
+    :param rtype: SWIG return type
+    :return: Python return type
+    """
+    try:
+        node = parse_type(rtype)
+    except ValueError:
+        return rtype
+    return translate_type(node, RET_TYPE_NAMES)
+
+
+def translate_value(val):
+    """
+    Convert C++ default arguments to Python
+
+    :param val: C++ argument as string
+    :return: Python argument
+    """
+    if val in VALUE_EXPRESSIONS:
+        return VALUE_EXPRESSIONS[val]
+    return VALUE_TOKEN_RE.sub(lambda match: VALUE_NAMES.get(match.group(), match.group()), val)
@@ -0,0 +1,147 @@
+"""
+Background writer for generated output files
+"""
+import os
+import queue
+import threading
+import time
+
+from .manifest import write_if_changed
+
+# Fixed timestamp of archive entries to make archives reproducible
+ARCHIVE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class OutputWriter:
+    """
+    Writes output files in a background thread, so that writing does not
+    block parsing and rendering of next modules
+
+    Files are written atomically and only if their contents have changed.
+    Files located in ``archive_root`` are stored in a zip archive instead,
+    which is written when the writer is closed. Entries of a previous archive
+    that have not been written again are kept.
+
+    Time spent on writing files and the archive is accumulated in
+    :attr:`write_time`, so it can be reported separately from the time
+    spent waiting for the writer.
+
+    :param archive_path: path to a zip archive
+    :param archive_root: directory whose files are stored in the archive
+    """
+
+    def __init__(self, archive_path=None, archive_root=None):
+        self._archive_path = archive_path
+        self._archive_root = archive_root
+        self._archive_entries = {}
+        self._old_archive_names = set()
+        if archive_path is not None and archive_path.exists():
+            import zipfile
+            with zipfile.ZipFile(archive_path) as archive:
+                self._old_archive_names = set(archive.namelist())
+        self._queue = queue.Queue()
+        self._error = None
+        self._closed = False
+        self.write_time = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(discard_archive=exc_type is not None)
+
+    def _arcname(self, path):
+        if self._archive_path is None:
+            return None
+        try:
+            return path.relative_to(self._archive_root).as_posix()
+        except ValueError:
+            return None
+
+    def exists(self, path):
+        """
+        Check if an output file exists
+
+        :param path: path to an output file
+        :return: True if the file exists on disk or in the archive
+        """
+        arcname = self._arcname(path)
+        if arcname is not None:
+            return arcname in self._old_archive_names or arcname in self._archive_entries
+        return path.exists()
+
+    def write(self, path, content, encoding=None):
+        """
+        Queue an output file for writing
+
+        :param path: path to an output file
+        :param content: file contents
+        :param encoding: file encoding for text contents
+        :raises Exception: the error of a previous file that has failed to write
+        """
+        if self._error is not None:
+            raise self._error
+        self._queue.put((path, content, encoding))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue
+            path, content, encoding = item
+            start = time.perf_counter()
+            try:
+                arcname = self._arcname(path)
+                if arcname is not None:
+                    if isinstance(content, str):
+                        content = content.encode(encoding or 'utf-8')
+                    self._archive_entries[arcname] = content
+                else:
+                    write_if_changed(path, content, encoding)
+            except Exception as exc:  # Re-raised in the main thread
+                self._error = exc
+            self.write_time += time.perf_counter() - start
+
+    def _write_archive(self):
+        # zipfile is slow to import and is needed only for archives
+        import zipfile
+        entries = self._archive_entries
+        if self._old_archive_names:
+            with zipfile.ZipFile(self._archive_path) as old_archive:
+                for name in self._old_archive_names - entries.keys():
+                    entries[name] = old_archive.read(name)
+        temp_path = self._archive_path.with_name(
+            f'.{self._archive_path.name}.{os.getpid()}.tmp')
+        try:
+            with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for name in sorted(entries):
+                    info = zipfile.ZipInfo(name, ARCHIVE_DATE_TIME)
+                    info.external_attr = 0o644 << 16
+                    archive.writestr(info, entries[name], zipfile.ZIP_DEFLATED)
+            os.replace(temp_path, self._archive_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+    def close(self, discard_archive=False):
+        """
+        Wait until all queued files are written and write the archive
+
+        :param discard_archive: do not write the archive
+        :raises Exception: the error of the first file that has failed to write
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        if self._archive_entries and not discard_archive:
+            start = time.perf_counter()
+            self._write_archive()
+            self.write_time += time.perf_counter() - start
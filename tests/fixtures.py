@@ -0,0 +1,247 @@
+"""
+Synthetic Doxygen and SWIG XML fixtures for benchmarks and tests of Kodistubs generator
+"""
+import random
+from xml.sax.saxutils import escape, quoteattr
+
+from kodistubs_generator.modules import MODULES, SWIG_XML
+
+# (group name, innerclass or None, Python module name) for each of MODULES
+MODULE_SPECS = {
+    'group__python__xbmc.xml': ('Library - xbmc', None, 'xbmc'),
+    'group__python__xbmcaddon.xml': ('Addon', 'XBMCAddon::xbmcaddon::Addon', 'xbmcaddon'),
+    'group__python__xbmcgui.xml': ('Library - xbmcgui', None, 'xbmcgui'),
+    'group__python__xbmcplugin.xml': ('Library - xbmcplugin', None, 'xbmcplugin'),
+    'group__python__xbmcvfs.xml': ('Library - xbmcvfs', None, 'xbmcvfs'),
+    'group__python__xbmcdrm.xml': ('CryptoSession', 'XBMCAddon::xbmcdrm::CryptoSession', 'xbmcdrm'),
+}
+
+WORDS = (
+    'the', 'player', 'item', 'list', 'control', 'window', 'addon', 'path', 'file',
+    'settings', 'value', 'string', 'returns', 'current', 'video', 'audio', 'label',
+    'property', 'Kodi', 'skin', 'dialog', 'playlist', 'café', 'naïve', '&', '<tag>',
+)
+
+ARG_TYPES = (
+    ('r.q(const).XBMCAddon::String', None),
+    ('r.q(const).String', 'XBMCAddon::emptyString'),
+    ('int', '0'),
+    ('int', 'XBFONT_LEFT'),
+    ('bool', 'false'),
+    ('bool', 'true'),
+    ('long', '-1'),
+    ('double', '0.0'),
+    ('unsigned int', 'INT_MAX'),
+    ('p.q(const).XBMCAddon::xbmcgui::ListItem', 'NULL'),
+    ('r.q(const).XBMCAddon::Properties', None),
+    ('r.q(const).std::vector<(XBMCAddon::String)>', None),
+    ('r.q(const).std::map<(XBMCAddon::String,XBMCAddon::String)>', None),
+    ('r.q(const).std::vector<(Tuple<(XBMCAddon::String,p.q(const).XBMCAddon::xbmcgui::ListItem,bool)>)>',
+     None),
+    ('r.q(const).Alternative<(XBMCAddon::String,p.q(const).XBMCAddon::xbmcgui::ListItem)>', None),
+    ('r.q(const).XBMCAddon::xbmc::PlayParameter', 'Player::defaultPlayParameter'),
+    ('r.q(const).XbmcCommons::Buffer', None),
+    ('r.q(const).std::vector<(int)>', 'std::vector< int >()'),
+)
+
+# Methods of the first class of each module whose Python names are changed
+# with SWIG %rename, like xbmcvfs.Stat.atime
+RENAMED_METHODS = {
+    'atime': 'st_atime',
+}
+
+RET_TYPES = (
+    'void',
+    'XBMCAddon::String',
+    'bool',
+    'int',
+    'long',
+    'double',
+    'xbmc::InfoTagVideo',
+    'XBMCAddon::xbmcgui::ListItem',
+    'std::vector<(XBMCAddon::String)>',
+    'XbmcCommons::Buffer',
+    'Alternative<(XBMCAddon::String,std::vector<(XBMCAddon::String)>)>',
+)
+
+
+class FixtureBuilder:
+    """
+    Builder of synthetic Doxygen group XML files and SWIG XML definitions
+    for all Kodi Python API modules
+
+    :param classes: number of classes per module
+    :param methods: number of methods per class and functions per module
+    :param params: maximum number of parameters per function
+    :param paragraphs: number of text paragraphs per detailed description
+    :param table_rows: number of rows in a table per detailed description
+    :param seed: random seed
+    """
+
+    def __init__(self, classes=5, methods=10, params=4, paragraphs=3, table_rows=4, seed=0):
+        self.classes = classes
+        self.methods = methods
+        self.params = params
+        self.paragraphs = paragraphs
+        self.table_rows = table_rows
+        self._random = random.Random(seed)
+        self._id = 0
+
+    def _words(self, count):
+        return escape(' '.join(self._random.choice(WORDS) for _ in range(count)))
+
+    def _inline(self, count):
+        parts = []
+        for _ in range(count):
+            kind = self._random.random()
+            if kind < 0.1:
+                parts.append(f'<bold>{self._words(2)}</bold>')
+            elif kind < 0.2:
+                parts.append(f'<computeroutput>{self._words(1)}</computeroutput>')
+            elif kind < 0.3:
+                parts.append(f'<ref refid="ref" kindref="member">{self._words(1)}</ref>')
+            else:
+                parts.append(self._words(self._random.randint(3, 10)))
+        return '\n'.join(parts)
+
+    def _table(self):
+        rows = []
+        for row in range(self.table_rows):
+            thead = 'yes' if row == 0 else 'no'
+            cells = ''.join(f'<entry thead="{thead}"><para>{self._words(3)}</para></entry>'
+                            for _ in range(3))
+            rows.append(f'<row>{cells}</row>')
+        return f'<table rows="{len(rows)}" cols="3">{"".join(rows)}</table>'
+
+    def _code(self):
+        lines = ('<codeline><highlight class="normal">'
+                 + '<sp/>'.join(self._words(1) for _ in range(4))
+                 + '</highlight></codeline>' for _ in range(4))
+        return f'<programlisting>{"".join(lines)}</programlisting>'
+
+    def _description(self, tag, param_names=None):
+        if param_names is None and tag == 'briefdescription':
+            return f'<{tag}><para>{self._inline(1)}</para></{tag}>'
+        chunks = [f'<para>\\python_func{{ {self._words(2)} }}</para>']
+        chunks += [f'<para>{self._inline(3)}</para>' for _ in range(self.paragraphs)]
+        if self.table_rows:
+            chunks.append(f'<para>{self._inline(1)}{self._table()}</para>')
+        if param_names:
+            items = ''.join(
+                f'<parameteritem><parameternamelist><parametername>{name}</parametername>'
+                f'</parameternamelist><parameterdescription><para>{self._inline(1)}</para>'
+                f'</parameterdescription></parameteritem>' for name in param_names)
+            chunks.append(f'<para><parameterlist kind="param">{items}</parameterlist>'
+                          f'<simplesect kind="return"><para>{self._inline(1)}</para></simplesect></para>')
+        chunks.append(f'<para><simplesect kind="note"><para>{self._inline(1)}</para></simplesect></para>')
+        chunks.append(f'<para><hruler/><bold>Example:</bold>{self._code()}</para>')
+        return f'<{tag}>\n' + '\n'.join(chunks) + f'\n</{tag}>'
+
+    def _functions(self, prefix):
+        functions = []
+        for index in range(self.methods):
+            params = [(f'arg{number}',) + self._random.choice(ARG_TYPES)
+                      for number in range(self._random.randint(0, self.params))]
+            functions.append((f'{prefix}Func{index}', params, self._random.choice(RET_TYPES)))
+        return functions
+
+    def _group_xml(self, refid, title, innerclass, functions, innergroups):
+        members = ''.join(
+            f'<memberdef kind="function" id="{refid}_{name}" prot="public" static="no">\n'
+            f'<type>void</type>\n<name>{name}</name>\n'
+            + self._description('briefdescription') + '\n'
+            + self._description('detaileddescription', [param[0] for param in params])
+            + '\n</memberdef>\n'
+            for name, params, _ in functions)
+        innerclass_xml = (f'<innerclass refid="class_{refid}" prot="public">{innerclass}</innerclass>\n'
+                          if innerclass else '')
+        innergroups_xml = ''.join(f'<innergroup refid="{group}">{group}</innergroup>\n'
+                                  for group in innergroups)
+        return (
+            "<?xml version='1.0' encoding='UTF-8' standalone='no'?>\n"
+            '<doxygen xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" version="1.8.13">\n'
+            f'<compounddef id="{refid}" kind="group">\n<compoundname>{refid}</compoundname>\n'
+            f'<title>{escape(title)}</title>\n{innerclass_xml}{innergroups_xml}'
+            f'<sectiondef kind="func">\n{members}</sectiondef>\n'
+            + self._description('briefdescription') + '\n'
+            + self._description('detaileddescription') + '\n'
+            '</compounddef>\n</doxygen>\n'
+        )
+
+    def _attr(self, name, value):
+        self._id += 1
+        return f'<attribute name="{name}" value={quoteattr(value)} id="{self._id}"/>'
+
+    def _swig_function(self, tag, name, params, rtype=None):
+        parms = ''.join(
+            '<parm><attributelist>' + self._attr('name', param_name) + self._attr('type', param_type)
+            + (self._attr('value', value) if value is not None else '') + '</attributelist></parm>'
+            for param_name, param_type, value in params)
+        sym_name = RENAMED_METHODS.get(name, name) if tag == 'cdecl' else name
+        return (f'<{tag}><attributelist>{self._attr("name", name)}'
+                f'{self._attr("sym_name", sym_name)}'
+                f'{self._attr("kind", "function")}<parmlist>{parms}</parmlist>'
+                + (self._attr('type', rtype) if rtype is not None else '')
+                + f'</attributelist></{tag}>\n')
+
+    def _swig_class(self, name, qualified_name, functions):
+        body = self._swig_function('constructor', name, [('value', 'int', '0')])
+        body += ''.join(self._swig_function('cdecl', func_name, params, rtype)
+                        for func_name, params, rtype in functions)
+        return (f'<class><attributelist>{self._attr("name", qualified_name)}'
+                f'{self._attr("sym_name", name)}<baselist><base name="AddonClass"/></baselist>'
+                f'</attributelist>\n{body}</class>\n')
+
+    def _typemaps(self):
+        return ''.join(f'<typemap><attributelist>{self._attr("method", "in")}'
+                       f'{self._attr("code", "arg = PyLong_AsLong(obj);" * 8)}</attributelist></typemap>\n'
+                       for _ in range(self.methods * 4))
+
+    def build(self, docs_dir, swig_dir):
+        """
+        Write fixtures for all Kodi Python API modules
+
+        :param docs_dir: directory for Doxygen docs, XML files are written
+            to ``xml`` subdirectory
+        :param swig_dir: directory for SWIG XML definitions
+        """
+        xml_dir = docs_dir / 'xml'
+        xml_dir.mkdir(parents=True, exist_ok=True)
+        swig_dir.mkdir(parents=True, exist_ok=True)
+        for module in MODULES:
+            title, innerclass, py_name = MODULE_SPECS[module]
+            refid = module[:-len('.xml')]
+            functions = self._functions('module')
+            innergroups = []
+            swig_classes = ''
+            for index in range(self.classes):
+                class_name = f'{py_name.capitalize()}Class{index}'
+                class_refid = f'{refid}__class{index}'
+                qualified_name = f'XBMCAddon::{py_name}::{class_name}'
+                methods = self._functions('method')
+                if index == 0:
+                    methods += [(name, [], 'long') for name in RENAMED_METHODS]
+                (xml_dir / (class_refid + '.xml')).write_text(
+                    self._group_xml(class_refid, class_name, qualified_name, methods, []),
+                    encoding='utf-8')
+                innergroups.append(class_refid)
+                swig_classes += self._swig_class(class_name, qualified_name, methods)
+            (xml_dir / module).write_text(
+                self._group_xml(refid, title, innerclass, functions, innergroups),
+                encoding='utf-8')
+            if innerclass is not None:
+                swig_classes += self._swig_class(innerclass.split('::')[-1], innerclass, functions)
+                swig_functions = ''
+            else:
+                swig_functions = ''.join(self._swig_function('cdecl', name, params, rtype)
+                                         for name, params, rtype in functions)
+            constants = ''.join(f'<constant><attributelist>{self._attr("sym_name", f"CONSTANT_{index}")}'
+                                f'{self._attr("value", str(index))}</attributelist></constant>\n'
+                                for index in range(self.methods))
+            (swig_dir / SWIG_XML[title]).write_text(
+                '<?xml version="1.0" ?>\n<top>\n'
+                f'<attributelist>{self._attr("name", py_name)}</attributelist>\n'
+                f'<include>{self._typemaps()}</include>\n'
+                f'<include><namespace>{swig_classes}{swig_functions}{constants}</namespace></include>\n'
+                '</top>\n',
+                encoding='utf-8')
@@ -0,0 +1,57 @@
+"""
+Tests for Kodistubs generation on synthetic Doxygen and SWIG XML fixtures
+"""
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from generator import BuildDirs, build_parser, generate_stubs, get_code_hash, get_doxy_state
+from kodistubs_generator.docsparser import parse_module
+from kodistubs_generator.doxygen import save_doxy_state
+from kodistubs_generator.modules import MODULES
+from tests.fixtures import FixtureBuilder
+
+
+class GeneratorTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(cls.temp_dir.name)
+        cls.kodi_src = root / 'kodi'
+        cls.swig_dir = cls.kodi_src / 'build' / 'swig'
+        cls.dirs = BuildDirs(root / 'build')
+        FixtureBuilder(classes=2, methods=3, paragraphs=1, table_rows=2).build(
+            cls.dirs.docs_dir, cls.swig_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def generate(self, *options):
+        src_dir = self.kodi_src / 'xbmc' / 'interfaces' / 'legacy'
+        src_dir.mkdir(parents=True, exist_ok=True)
+        # Doxygen XML fixtures are up to date, so Doxygen is not run
+        save_doxy_state(self.dirs.doxy_state_path, get_doxy_state(src_dir))
+        args = build_parser().parse_args([str(self.kodi_src), *options])
+        output = io.StringIO()
+        with redirect_stdout(output):
+            generate_stubs(self.kodi_src, self.dirs, args, get_code_hash())
+        return output.getvalue()
+
+    def test_all_symbols_matched(self):
+        # Documented symbols, including renamed methods, are found in SWIG XML
+        for module in MODULES:
+            with self.subTest(module=module):
+                module_docs = parse_module(module, self.dirs.docs_dir, self.swig_dir)
+                self.assertEqual(module_docs.dropped, [])
+
+    def test_noop_run(self):
+        self.assertIn('Writing', self.generate('--force'))
+        self.assertNotIn('Writing', self.generate())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Tests for translation of SWIG types and C++ default values to Python
+"""
+import unittest
+
+from kodistubs_generator.swigtypes import (translate_decl_type, translate_ret_type,
+                                           translate_value)
+
+# SWIG argument types and their Python types, including all spellings
+# that were translated by the former regex chains
+DECL_TYPES = [
+    ('r.q(const).XBMCAddon::xbmcgui::InfoLabelDict', 'Dict[str, str]'),
+    ('r.q(const).XBMCAddon::Properties', 'Dict[str, str]'),
+    ('r.q(const).std::vector<(XBMCAddon::Properties)>', 'List[Dict[str, str]]'),
+    ('r.q(const).std::vector<(Tuple<(XBMCAddon::String,p.q(const).XBMCAddon::xbmcgui::ListItem,bool)>)>',
+     'List[Tuple[str, ListItem, bool]]'),
+    ('r.q(const).std::vector<(Tuple<(XBMCAddon::String,XBMCAddon::String)>)>',
+     'List[Tuple[str, str]]'),
+    ('r.q(const).std::vector<(Alternative<(XBMCAddon::String,p.q(const).XBMCAddon::xbmcgui::ListItem)>)>',
+     'List[Union[str, ListItem]]'),
+    ('r.q(const).std::map<(XBMCAddon::String,Tuple<(float,int)>)>', 'Dict[str, Tuple[float, int]]'),
+    ('r.q(const).Alternative<(XBMCAddon::String,p.q(const).XBMCAddon::xbmcgui::ListItem)>',
+     'Union[str, ListItem]'),
+    ('r.q(const).Alternative<(XBMCAddon::String,p.q(const).ListItem)>', 'Union[str, ListItem]'),
+    ('r.q(const).std::vector<(XBMCAddon::String)>', 'List[str]'),
+    ('r.q(const).std::vector<(p.q(const).XBMCAddon::xbmc::Actor)>', 'List[Actor]'),
+    ('r.q(const).std::vector<(Tuple<(int,std::string)>)>', 'List[Tuple[int, str]]'),
+    ('r.q(const).std::vector<(int)>', 'List[int]'),
+    ('r.q(const).std::map<(XBMCAddon::String,XBMCAddon::String)>', 'Dict[str, str]'),
+    ('std::vector<(p.XBMCAddon::xbmcgui::Control)>', 'List[Control]'),
+    ('std::vector<(XBMCAddon::String)>', 'List[str]'),
+    ('p.q(const).XBMCAddon::xbmcgui::Control', 'Control'),
+    ('p.q(const).XBMCAddon::xbmc::VideoStreamDetail', 'VideoStreamDetail'),
+    ('p.q(const).XBMCAddon::xbmc::AudioStreamDetail', 'AudioStreamDetail'),
+    ('p.q(const).XBMCAddon::xbmc::SubtitleStreamDetail', 'SubtitleStreamDetail'),
+    ('r.q(const).std::vector<(p.q(const).XBMCAddon::xbmcgui::ListItem)>', 'List[ListItem]'),
+    ('p.XBMCAddon::xbmcgui::Control', 'Control'),
+    ('p.XBMCAddon::xbmc::Actor', 'Actor'),
+    ('r.q(const).XBMCAddon::String', 'str'),
+    ('p.XBMCAddon::xbmcgui::Action', 'Action'),
+    ('XBMCAddon::String', 'str'),
+    ('r.q(const).String', 'str'),
+    ('r.q(const).std::string', 'str'),
+    ('r.q(const).std::vector<(bool)>', 'List[bool]'),
+    ('r.q(const).std::vector<(double)>', 'List[float]'),
+    ('String', 'str'),
+    ('std::string', 'str'),
+    ('p.q(const).XBMCAddon::xbmcgui::ListItemList', 'List[ListItem]'),
+    ('p.q(const).XBMCAddon::xbmcgui::ListItem', 'ListItem'),
+    ('p.XBMCAddon::xbmcgui::ListItem', 'ListItem'),
+    ('XBMCAddon::xbmcgui::ListItem', 'ListItem'),
+    ('p.q(const).ListItem', 'ListItem'),
+    ('r.q(const).XBMCAddon::xbmc::PlayParameter', 'Union[str, PlayList]'),
+    ('p.q(const).PlayList', 'PlayList'),
+    ('r.q(const).XbmcCommons::Buffer', 'Union[str, bytes, bytearray]'),
+    ('r.XbmcCommons::Buffer', 'Union[str, bytes, bytearray]'),
+    ('long long', 'int'),
+    ('long', 'int'),
+    ('double', 'float'),
+    ('unsigned int', 'int'),
+    ('p.q(const).char', 'str'),
+    ('r.std::map<(str, str, std::less<()>)>', 'Dict[str, str]'),
+    ('r.std::vector<(Tuple<(int, str, str)>)>', 'Tuple[int, str, str]'),
+    ('unsigned long', 'int'),
+    ('unsigned long long', 'int'),
+    ('long int', 'int'),
+    ('long long int', 'int'),
+    ('unsigned long long int', 'int'),
+    ('signed int', 'int'),
+    ('signed long', 'int'),
+    ('signed', 'int'),
+    ('unsigned', 'int'),
+    ('short', 'int'),
+    ('unsigned short', 'int'),
+    ('r.q(const).std::vector<(unsigned long)>', 'List[int]'),
+    ('r.std::vector<(Tuple<(unsigned long, str, str)>)>', 'Tuple[int, str, str]'),
+]
+
+# SWIG return types and their Python types
+RET_TYPES = [
+    ('void', 'None'),
+    ('double', 'float'),
+    ('long long', 'int'),
+    ('long', 'int'),
+    ('unsigned int', 'int'),
+    ('xbmc::InfoTagVideo', 'InfoTagVideo'),
+    ('xbmc::InfoTagMusic', 'InfoTagMusic'),
+    ('xbmc::InfoTagPicture', 'InfoTagPicture'),
+    ('xbmc::InfoTagGame', 'InfoTagGame'),
+    ('XBMCAddon::xbmcgui::ListItem', 'ListItem'),
+    ('XBMCAddon::xbmcgui::Control', 'Control'),
+    ('std::unique_ptr<(std::vector<(int)>)>', 'List[int]'),
+    ('Alternative<(XBMCAddon::String,std::vector<(XBMCAddon::String)>)>', 'Union[str, List[str]]'),
+    ('std::vector<(std::string)>', 'List[str]'),
+    ('p.XBMCAddon::xbmc::Actor', 'Actor'),
+    ('XBMCAddon::String', 'str'),
+    ('q(const).char', 'str'),
+    ('XbmcCommons::Buffer', 'bytearray'),
+    ('unsigned long', 'int'),
+    ('unsigned long long', 'int'),
+    ('long int', 'int'),
+    ('long long int', 'int'),
+    ('unsigned long long int', 'int'),
+    ('signed int', 'int'),
+    ('signed long', 'int'),
+    ('signed', 'int'),
+    ('unsigned', 'int'),
+    ('short', 'int'),
+    ('unsigned short', 'int'),
+    ('std::unique_ptr<(std::vector<(unsigned long long)>)>', 'List[int]'),
+    ('std::vector<(signed long long int)>', 'List[int]'),
+]
+
+# C++ default values and their Python values
+VALUES = [
+    ('false', 'False'),
+    ('true', 'True'),
+    ('XBFONT_LEFT', '0'),
+    ('XBFONT_CENTER_Y', '4'),
+    ('lLOGDEBUG', 'LOGDEBUG'),
+    ('CLangCodeExpander::ENGLISH_NAME', 'ENGLISH_NAME'),
+    ('XBMCAddon::emptyString', '""'),
+    ('double', 'float'),
+    ('Player::defaultPlayParameter', '""'),
+    ('std::vector< int >()', 'None'),
+    ('NULL', 'None'),
+    ('XBMCAddon::xbmcgui::INPUT_ALPHANUM', 'INPUT_ALPHANUM'),
+    ('SEEK_SET', '0'),
+    ('CONTROL_NO_BUTTON', 'DLG_YESNO_NO_BTN'),
+    ('std::vector< XBMCAddon::xbmcgui::ListItem const * >()', '()'),
+    ('INT_MAX', '2147483647'),
+]
+
+
+class SwigTypesTestCase(unittest.TestCase):
+
+    def test_translate_decl_type(self):
+        for decl, py_type in DECL_TYPES:
+            with self.subTest(decl=decl):
+                self.assertEqual(translate_decl_type(decl), py_type)
+
+    def test_translate_ret_type(self):
+        for rtype, py_type in RET_TYPES:
+            with self.subTest(rtype=rtype):
+                self.assertEqual(translate_ret_type(rtype), py_type)
+
+    def test_translate_value(self):
+        for value, py_value in VALUES:
+            with self.subTest(value=value):
+                self.assertEqual(translate_value(value), py_value)
+
+
+if __name__ == '__main__':
+    unittest.main()